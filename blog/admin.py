@@ -6,7 +6,7 @@ from .models import Post, Category, Tag
 
 
 class PostAdmin(admin.ModelAdmin):
-    list_display = ['title', 'id', 'excerpt', 'created_time', 'modified_time', 'category', 'views', 'author']
+    list_display = ['title', 'id', 'excerpt', 'created_time', 'modified_time', 'category', 'views', 'comment_count', 'author']
     list_per_page = 10  # 每页显示数量
     actions_on_bottom = True    # 底部增加操作选项
     search_fields = ['title']   # 搜索框
@@ -20,13 +20,13 @@ class PostAdmin(admin.ModelAdmin):
 
 
 class CategoryAdmin(admin.ModelAdmin):
-    list_display = ['name', 'id']
+    list_display = ['name', 'id', 'post_count']
     list_per_page = 10
     actions_on_bottom = True
 
 
 class TagAdmin(admin.ModelAdmin):
-    list_display = ['name', 'id']
+    list_display = ['name', 'id', 'post_count']
     list_per_page = 10
     actions_on_bottom = True
 
@@ -0,0 +1,48 @@
+import logging
+import threading
+import time
+
+import jieba
+from django.conf import settings
+from jieba.analyse import ChineseAnalyzer
+
+# jieba 分词器
+
+"""jieba 在第一次分词时才加载词典，每个进程重启后第一次搜索或写索引都要多等几秒
+这里提供全局共用的分析器，并可在应用启动时（BlogConfig.ready）预先加载词典，把等待移到启动阶段
+词典加载后会写入缓存文件（JIEBA_CACHE_FILE），之后的进程直接读取缓存，比解析原始词典快得多"""
+
+logger = logging.getLogger(__name__)
+
+_analyzer = None
+_lock = threading.Lock()
+
+# 本进程加载词典所用的秒数，尚未加载时为 None
+dictionary_load_time = None
+
+
+def get_analyzer():
+    """返回全局共用的 ChineseAnalyzer，索引的所有 TEXT 字段使用同一个分析器"""
+    global _analyzer
+    if _analyzer is None:
+        with _lock:
+            if _analyzer is None:
+                _analyzer = ChineseAnalyzer()
+    return _analyzer
+
+
+def preload_dictionary():
+    """加载 jieba 词典并记录耗时，已加载过则直接返回"""
+    global dictionary_load_time
+    if jieba.dt.initialized:
+        return dictionary_load_time
+
+    cache_file = getattr(settings, 'JIEBA_CACHE_FILE', None)
+    if cache_file:
+        jieba.dt.cache_file = cache_file
+
+    started = time.time()
+    jieba.initialize()
+    dictionary_load_time = time.time() - started
+    logger.info('jieba dictionary loaded in %.3f s', dictionary_load_time)
+    return dictionary_load_time
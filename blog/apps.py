@@ -1,5 +1,21 @@
 from django.apps import AppConfig
+from django.conf import settings
 
 
 class BlogConfig(AppConfig):
     name = 'blog'
+
+    def ready(self):
+        # 注册信号处理函数
+        from . import signals  # noqa
+
+        # 文章写入搜索索引后重新计算它的相关文章，并更新搜索框的输入提示
+        from . import related, suggest
+        from .search_signals import index_queue
+        index_queue.connect(related.on_index_updated)
+        index_queue.connect(suggest.on_index_updated)
+
+        # 预先加载 jieba 词典，避免重启后的第一次搜索或写索引等待加载词典
+        if getattr(settings, 'JIEBA_PRELOAD', False):
+            from .analyzer import preload_dictionary
+            preload_dictionary()
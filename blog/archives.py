@@ -0,0 +1,52 @@
+import datetime
+from collections import Counter
+
+from django.db import transaction
+from django.db.models import F
+from django.utils import timezone
+
+from .models import Post, ArchiveMonth
+
+# 按月归档
+
+"""侧边栏的归档原来每次都用 dates('created_time', 'month') 扫描全部文章
+归档页用 created_time__year/__month 筛选，数据库需要对每一行提取年月，用不上 created_time 的索引
+现在：
+    1. 每个月的文章数保存在 ArchiveMonth 表中，文章保存或删除时（见 signals.py）增减对应月份的计数
+    2. 归档页按 [本月第一天, 下月第一天) 的半开区间筛选 created_time，可以使用索引
+    3. 计数有偏差时可以运行 rebuild_archives 命令从文章表重新统计"""
+
+
+def month_of(value):
+    """value 所在月份的第一天（date），启用时区时按当前时区计算"""
+    if timezone.is_aware(value):
+        value = timezone.localtime(value)
+    return datetime.date(value.year, value.month, 1)
+
+
+def month_range(year, month):
+    """某个月的半开区间 [本月第一天 0 点, 下月第一天 0 点)"""
+    start = datetime.datetime(year, month, 1)
+    end = datetime.datetime(year + month // 12, month % 12 + 1, 1)
+    if timezone.is_aware(timezone.now()):
+        start = timezone.make_aware(start)
+        end = timezone.make_aware(end)
+    return start, end
+
+
+def adjust_month(month, delta):
+    """把 month 月份的文章数加上 delta"""
+    with transaction.atomic():
+        ArchiveMonth.objects.get_or_create(month=month)
+        ArchiveMonth.objects.filter(month=month).update(post_count=F('post_count') + delta)
+
+
+def rebuild_archive_months():
+    """从文章表重新统计每个月的文章数，返回月份数"""
+    counts = Counter(month_of(created_time) for created_time in
+                     Post.objects.values_list('created_time', flat=True).iterator())
+    with transaction.atomic():
+        ArchiveMonth.objects.all().delete()
+        ArchiveMonth.objects.bulk_create([ArchiveMonth(month=month, post_count=count)
+                                          for month, count in counts.items()])
+    return len(counts)
@@ -0,0 +1,113 @@
+import atexit
+import logging
+import threading
+from collections import defaultdict
+
+from django.conf import settings
+from django.db import connection
+from django.db.models import F
+
+# 阅读量计数相关代码
+
+"""文章阅读量的批量计数器
+每次访问只在内存中把对应文章的待写入增量 +1，不访问数据库
+后台定时（或积累的增量达到阈值时）把增量合并成 UPDATE ... SET views = views + n 写入数据库
+    F 表达式在数据库中完成加法，多个进程同时写入也不会丢失计数
+    增量相同的文章合并到同一条 UPDATE 语句中"""
+
+logger = logging.getLogger(__name__)
+
+
+class ViewCounter(object):
+    """缓冲阅读量增量的计数器，每个进程一个实例
+    flush_interval：两次写入数据库的最长间隔（秒），为 0 时每次访问都立即写入
+    flush_threshold：缓冲的总增量达到该值时立即写入"""
+
+    def __init__(self, flush_interval=None, flush_threshold=None):
+        self.flush_interval = flush_interval
+        self.flush_threshold = flush_threshold
+        self._pending = defaultdict(int)
+        self._lock = threading.Lock()
+        self._timer = None
+
+    def get_flush_interval(self):
+        if self.flush_interval is not None:
+            return self.flush_interval
+        return getattr(settings, 'VIEW_COUNT_FLUSH_INTERVAL', 10)
+
+    def get_flush_threshold(self):
+        if self.flush_threshold is not None:
+            return self.flush_threshold
+        return getattr(settings, 'VIEW_COUNT_FLUSH_THRESHOLD', 100)
+
+    def incr(self, pk, count=1):
+        """文章 pk 的阅读量增加 count"""
+        with self._lock:
+            self._pending[pk] += count
+            total = sum(self._pending.values())
+            flush_now = self.get_flush_interval() <= 0 or total >= self.get_flush_threshold()
+            if not flush_now and self._timer is None:
+                self._timer = threading.Timer(self.get_flush_interval(), self._flush_in_background)
+                self._timer.daemon = True
+                self._timer.start()
+
+        if flush_now:
+            self.flush()
+
+    def pending(self, pk):
+        """文章 pk 尚未写入数据库的阅读量增量"""
+        with self._lock:
+            return self._pending.get(pk, 0)
+
+    def flush(self):
+        """把缓冲的增量写入数据库，返回写入的文章数"""
+        from .models import Post
+
+        with self._lock:
+            pending, self._pending = self._pending, defaultdict(int)
+            if self._timer is not None:
+                self._timer.cancel()
+                self._timer = None
+
+        if not pending:
+            return 0
+
+        # 增量相同的文章合并到同一条 UPDATE 语句
+        by_count = defaultdict(list)
+        for pk, count in pending.items():
+            by_count[count].append(pk)
+
+        try:
+            for count, pks in by_count.items():
+                Post.objects.filter(pk__in=pks).update(views=F('views') + count)
+        except Exception:
+            # 写入失败时把增量放回缓冲区，等待下次写入
+            with self._lock:
+                for pk, count in pending.items():
+                    self._pending[pk] += count
+            raise
+
+        return len(pending)
+
+    def _flush_in_background(self):
+        with self._lock:
+            self._timer = None
+        try:
+            self.flush()
+        except Exception:
+            logger.exception('Failed to flush buffered post views')
+        finally:
+            # 后台线程用完数据库连接后需要自行关闭
+            connection.close()
+
+
+view_counter = ViewCounter()
+
+
+@atexit.register
+def _flush_on_exit():
+    """进程退出前写入剩余的增量"""
+    try:
+        view_counter.flush()
+    except Exception:
+        logger.exception('Failed to flush buffered post views on exit')
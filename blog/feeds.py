@@ -1,9 +1,52 @@
+import hashlib
+import uuid
+
+from django.conf import settings
 from django.contrib.syndication.views import Feed
+from django.core.cache import cache
+from django.db.models import Max
+from django.http import HttpResponse
+from django.utils import timezone
+from django.views.decorators.http import condition
 
+from .markdown_render import render_body
 from .models import Post
 
 # RSS功能相关代码
 
+"""聚合器会频繁轮询 RSS，因此生成的 XML 整体放入缓存，直到文章改变（见 signals.py）
+响应带有 ETag 和 Last-Modified（最新的 modified_time），客户端的条件请求在缓存有效时
+直接返回 304，不需要查询数据库
+XML 中的链接是带域名的绝对地址，因此按请求的域名分别缓存，所有域名的缓存共用一个版本号，一起失效"""
+
+FEED_VERSION_KEY = 'blog:feed_version'
+
+
+def get_feed_cache_key(request):
+    """当前版本号下，请求的域名对应的 RSS 缓存键"""
+    version = cache.get(FEED_VERSION_KEY)
+    if version is None:
+        cache.add(FEED_VERSION_KEY, uuid.uuid4().hex, None)
+        version = cache.get(FEED_VERSION_KEY)
+    return 'blog:feed:%s:%s' % (version, request.get_host())
+
+
+def invalidate_feed():
+    """清除全部域名的 RSS 缓存"""
+    cache.set(FEED_VERSION_KEY, uuid.uuid4().hex, None)
+
+
+def get_last_modified():
+    """最新的 modified_time，转换为 UTC 时间
+    USE_TZ = False 时数据库中是 TIME_ZONE（Asia/Shanghai）的本地时间，
+    condition 会把不带时区的时间当作 UTC 输出到 Last-Modified，因此先加上本地时区"""
+    last_modified = Post.objects.aggregate(Max('modified_time'))['modified_time__max']
+    if last_modified is None:
+        return None
+    if timezone.is_naive(last_modified):
+        last_modified = timezone.make_aware(last_modified, timezone.get_default_timezone())
+    return last_modified.astimezone(timezone.utc)
+
 
 class AllPostsRssFeed(Feed):
     """生成规范化的XML文档以方便聚合器阅读"""
@@ -17,14 +60,45 @@ class AllPostsRssFeed(Feed):
     # 显示在聚合器上的描述信息
     description = "我什么都没忘，但有些事只适合珍藏"
 
-    # 需要显示的内容条目
+    def __call__(self, request, *args, **kwargs):
+        """从缓存中取出生成好的 XML，并根据 ETag 和 Last-Modified 处理条件请求"""
+        state = self.get_cached_feed(request, *args, **kwargs)
+
+        @condition(etag_func=lambda *a, **kw: state['etag'],
+                   last_modified_func=lambda *a, **kw: state['last_modified'])
+        def view(request, *args, **kwargs):
+            return HttpResponse(state['content'], content_type=state['content_type'])
+
+        return view(request, *args, **kwargs)
+
+    def get_cached_feed(self, request, *args, **kwargs):
+        """缓存中没有 RSS 时生成一次，连同 ETag 和最后修改时间一起放入缓存"""
+        key = get_feed_cache_key(request)
+        state = cache.get(key)
+        if state is None:
+            response = super(AllPostsRssFeed, self).__call__(request, *args, **kwargs)
+            state = {
+                'content': response.content,
+                'content_type': response['Content-Type'],
+                'etag': hashlib.md5(response.content).hexdigest(),
+                'last_modified': get_last_modified(),
+            }
+            cache.set(key, state, None)
+        return state
+
+    # 需要显示的内容条目，只输出最新的 RSS_FEED_ITEM_COUNT 篇文章，并一次取出分类
     def items(self):
-        return Post.objects.all()
+        count = getattr(settings, 'RSS_FEED_ITEM_COUNT', 20)
+        return Post.objects.select_related('category').defer('toc').order_by('-created_time')[:count]
 
     # 聚合器中显示的内容条目的标题
     def item_title(self, item):
         return "[%s] %s" % (item.category, item.title)
 
-    # 聚合器显示的内容条目的描述
+    # 聚合器显示的内容条目的描述，使用渲染后的 HTML 正文
     def item_description(self, item):
-        return item.body
+        return item.body_html or render_body(item.body)[0]
+
+    # 内容条目的发布时间
+    def item_pubdate(self, item):
+        return item.created_time
@@ -0,0 +1,107 @@
+import random
+import time
+
+from django.contrib.auth.models import User
+from django.core.management.base import BaseCommand
+from django.db import transaction
+from django.utils import timezone
+from haystack import connections
+from haystack.constants import DJANGO_CT, DJANGO_ID
+from haystack.models import SearchResult
+from haystack.utils.app_loading import haystack_get_model
+
+from blog.models import Post, Category
+from blog.search_indexes import PostIndex
+from blog.whoosh_cn_backend import WhooshSearchBackend
+from .bench_search import fake_text
+
+# 搜索结果解码的性能基准测试
+
+
+def legacy_process_results(backend, raw_page):
+    """原来的 _process_results 对每条结果的处理：每个字段都重新查找模型和索引，
+    没有 convert 的字段逐个尝试日期正则和 json 解析"""
+    unified_index = connections[backend.connection_alias].get_unified_index()
+    indexed_models = unified_index.get_indexed_models()
+    results = []
+
+    for doc_offset, raw_result in enumerate(raw_page):
+        score = raw_page.score(doc_offset) or 0
+        app_label, model_name = raw_result[DJANGO_CT].split('.')
+        additional_fields = {}
+        model = haystack_get_model(app_label, model_name)
+
+        if model and model in indexed_models:
+            for key, value in raw_result.items():
+                index = unified_index.get_index(model)
+                string_key = str(key)
+
+                if string_key in index.fields and hasattr(index.fields[string_key], 'convert'):
+                    if index.fields[string_key].is_multivalued:
+                        additional_fields[string_key] = value.split(',') if value else []
+                    else:
+                        additional_fields[string_key] = index.fields[string_key].convert(value)
+                else:
+                    additional_fields[string_key] = backend._to_python(value)
+
+            del(additional_fields[DJANGO_CT])
+            del(additional_fields[DJANGO_ID])
+            results.append(SearchResult(app_label, model_name, raw_result[DJANGO_ID], score, **additional_fields))
+
+    return results
+
+
+class Command(BaseCommand):
+    """对比原来的逐字段解码和预编译的结果解码器处理每条搜索结果的耗时
+    与 bench_search 一样，模拟文章在回滚的事务中插入，索引放在内存中"""
+    help = '对比搜索结果解码前后每条结果的耗时'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--size', type=int, default=2000,
+                            help='模拟的文章数')
+        parser.add_argument('--query', default='缓存',
+                            help='搜索关键词')
+        parser.add_argument('--page-size', type=int, default=100,
+                            help='每次解码的结果数')
+        parser.add_argument('--repeat', type=int, default=50,
+                            help='重复执行的次数，取中位数')
+
+    def handle(self, *args, **options):
+        with transaction.atomic():
+            self.bench(options['size'], options['query'], options['page_size'], options['repeat'])
+            transaction.set_rollback(True)
+
+    def bench(self, size, query, page_size, repeat):
+        rng = random.Random(size)
+        now = timezone.now()
+        author = User.objects.create(username='bench-results-%d' % size)
+        category = Category.objects.create(name='bench')
+        Post.objects.bulk_create([
+            Post(title=fake_text(rng, 4), body=fake_text(rng, 200), excerpt='bench',
+                 created_time=now, modified_time=now, category=category, author=author)
+            for _ in range(size)
+        ], batch_size=1000)
+
+        backend = WhooshSearchBackend('default', STORAGE='ram')
+        backend.setup()
+        backend.clear()
+        backend.update(PostIndex(), list(Post.objects.filter(category=category)))
+
+        with backend.searcher_pool.searcher() as pooled:
+            raw_page = pooled.searcher.search_page(backend.parser.parse(query), 1, pagelen=page_size)
+            hits = len(raw_page.results[raw_page.offset:raw_page.offset + page_size])
+            if not hits:
+                self.stdout.write('没有搜索结果')
+                return
+
+            for name, func in (('原来的实现', lambda: legacy_process_results(backend, raw_page)),
+                               ('预编译解码器', lambda: backend._process_results(raw_page))):
+                timings = []
+                for _ in range(repeat):
+                    started = time.time()
+                    func()
+                    timings.append(time.time() - started)
+                timings.sort()
+                self.stdout.write('  %-10s 每条结果 %8.1f us' % (name, timings[len(timings) // 2] / hits * 1000000))
+
+        backend.clear()
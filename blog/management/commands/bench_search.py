@@ -0,0 +1,87 @@
+import random
+import time
+
+from django.contrib.auth.models import User
+from django.core.management.base import BaseCommand
+from django.db import transaction
+from django.db.models import Q
+from django.utils import timezone
+
+from blog.models import Post, Category
+from blog.search_indexes import PostIndex
+from blog.whoosh_cn_backend import WhooshSearchBackend
+
+# 搜索性能基准测试
+
+WORDS = ['时光', '笔记', '博客', '文章', '搜索', '索引', '分词', '数据库', '缓存', '性能',
+         'django', 'python', 'whoosh', 'mysql', 'markdown', 'template', 'query', 'view']
+
+
+def fake_text(rng, length):
+    return ' '.join(rng.choice(WORDS) for _ in range(length))
+
+
+class Command(BaseCommand):
+    """对比 icontains 全表扫描和全文索引检索的延迟
+    在一个最终回滚的事务中批量插入指定数量的模拟文章，并建立一个内存中的 Whoosh 索引
+    测试结束后数据库和磁盘上的索引都不会有任何改变"""
+    help = '对比 icontains 扫描和 Whoosh 全文索引的搜索延迟'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--sizes', nargs='+', type=int, default=[10000, 100000],
+                            help='模拟的文章数，可指定多个')
+        parser.add_argument('--query', default='缓存',
+                            help='搜索关键词')
+        parser.add_argument('--repeat', type=int, default=5,
+                            help='每种方式重复执行的次数，取中位数')
+        parser.add_argument('--page-size', type=int, default=10,
+                            help='全文检索每页的结果数')
+
+    def handle(self, *args, **options):
+        for size in options['sizes']:
+            with transaction.atomic():
+                self.bench(size, options['query'], options['repeat'], options['page_size'])
+                transaction.set_rollback(True)
+
+    def bench(self, size, query, repeat, page_size):
+        rng = random.Random(size)
+        now = timezone.now()
+        author = User.objects.create(username='bench-search-%d' % size)
+        category = Category.objects.create(name='bench')
+
+        for start in range(0, size, 1000):
+            Post.objects.bulk_create([
+                Post(title=fake_text(rng, 4), body=fake_text(rng, 200), excerpt='bench',
+                     created_time=now, modified_time=now, category=category, author=author)
+                for _ in range(start, min(start + 1000, size))
+            ])
+
+        # 使用内存存储，不影响磁盘上的正式索引
+        backend = WhooshSearchBackend('default', STORAGE='ram')
+        backend.setup()
+        backend.clear()
+        index = PostIndex()
+        started = time.time()
+        posts = Post.objects.filter(category=category)
+        for start in range(0, size, 1000):
+            backend.update(index, list(posts.order_by('pk')[start:start + 1000]))
+        self.stdout.write('%d 篇文章，建立索引耗时 %.1f s' % (size, time.time() - started))
+
+        def scan():
+            # 原来的实现：逐行匹配标题和正文，并取出全部结果
+            return list(posts.filter(Q(title__icontains=query) | Q(body__icontains=query)).values_list('pk', flat=True))
+
+        def indexed():
+            return backend.search(query, start_offset=0, end_offset=page_size)
+
+        for name, func in (('icontains', scan), ('whoosh', indexed)):
+            timings = []
+            for _ in range(repeat):
+                started = time.time()
+                func()
+                timings.append(time.time() - started)
+            timings.sort()
+            self.stdout.write('  %-10s 中位数 %8.2f ms  最慢 %8.2f ms' % (
+                name, timings[len(timings) // 2] * 1000, timings[-1] * 1000))
+
+        backend.clear()
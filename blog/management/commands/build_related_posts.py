@@ -0,0 +1,31 @@
+from django.core.management.base import BaseCommand
+
+from blog.models import Post
+from blog.related import update_related, get_related_num
+from .bulk_rebuild_index import iter_chunks
+
+# 重新计算全部文章的相关文章
+
+
+class Command(BaseCommand):
+    """用全文索引为每篇文章计算相关文章并保存到 RelatedPost 表
+    文章保存时只会更新它自己的相关文章，新文章出现在其它文章的相关文章中需要运行此命令
+    需要先建立好搜索索引（rebuild_index 或 bulk_rebuild_index）"""
+    help = '重新计算全部文章的相关文章'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--using', default='default',
+                            help='HAYSTACK_CONNECTIONS 中的连接名')
+        parser.add_argument('--num', type=int, default=get_related_num(),
+                            help='每篇文章保存的相关文章数')
+        parser.add_argument('--chunk-size', type=int, default=200,
+                            help='每次从数据库读取的文章数')
+
+    def handle(self, *args, **options):
+        posts = 0
+        links = 0
+        for chunk in iter_chunks(Post.objects.only('id'), options['chunk_size']):
+            links += update_related(chunk, options['using'], options['num'])
+            posts += len(chunk)
+
+        self.stdout.write('已计算 %d 篇文章的相关文章，共 %d 条' % (posts, links))
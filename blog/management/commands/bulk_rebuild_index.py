@@ -0,0 +1,63 @@
+import time
+from multiprocessing import cpu_count
+
+from django.core.management.base import BaseCommand
+from haystack import connections
+
+from blog.models import Post
+
+# 批量重建搜索索引
+
+
+def iter_chunks(queryset, chunk_size):
+    """按主键分块遍历查询集，每块用 iterator() 逐行读取，不会一次把全部文章载入内存"""
+    last_pk = 0
+    while True:
+        chunk = list(queryset.filter(pk__gt=last_pk).order_by('pk')[:chunk_size].iterator())
+        if not chunk:
+            return
+        yield chunk
+        last_pk = chunk[-1].pk
+
+
+class Command(BaseCommand):
+    """清空索引后批量写入全部文章，代替逐篇写入的 rebuild_index
+    文章在本进程中分块读取并准备索引文档，jieba 分词在 Whoosh 的多个写入进程中并行完成
+    运行过程中输出已写入的文章数和每秒写入的文档数"""
+    help = '使用多进程 Whoosh 写入器清空并重建文章的搜索索引'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--using', default='default',
+                            help='HAYSTACK_CONNECTIONS 中的连接名')
+        parser.add_argument('--procs', type=int, default=cpu_count(),
+                            help='分词和写入使用的进程数')
+        parser.add_argument('--chunk-size', type=int, default=500,
+                            help='每次从数据库读取的文章数')
+        parser.add_argument('--batch-size', type=int, default=100,
+                            help='每个写入进程每批处理的文档数')
+        parser.add_argument('--limitmb', type=int, default=128,
+                            help='每个写入进程使用的内存上限（MB）')
+        parser.add_argument('--no-multisegment', action='store_false', dest='multisegment', default=True,
+                            help='提交时把各进程写入的段合并为一个段')
+
+    def handle(self, *args, **options):
+        backend = connections[options['using']].get_backend()
+        index = connections[options['using']].get_unified_index().get_index(Post)
+        queryset = index.index_queryset(using=options['using'])
+
+        backend.clear()
+        started = time.time()
+        state = {'prepared': 0}
+
+        def stream():
+            for chunk in iter_chunks(queryset, options['chunk_size']):
+                for obj in chunk:
+                    yield obj
+                state['prepared'] += len(chunk)
+                elapsed = time.time() - started
+                self.stdout.write('已读取 %d 篇文章，%.1f 篇/秒' % (state['prepared'], state['prepared'] / (elapsed or 1)))
+
+        written = backend.bulk_update(index, stream(), procs=options['procs'], batchsize=options['batch_size'],
+                                      multisegment=options['multisegment'], limitmb=options['limitmb'])
+        elapsed = time.time() - started
+        self.stdout.write('共写入 %d 篇文章，耗时 %.1f 秒，%.1f 篇/秒' % (written, elapsed, written / (elapsed or 1)))
@@ -0,0 +1,17 @@
+from django.core.management.base import BaseCommand
+
+from blog.archives import rebuild_archive_months
+from blog.sidebar import invalidate_sidebar
+
+# 重新统计归档月份
+
+
+class Command(BaseCommand):
+    """从文章表重新统计每个月的文章数，写入 ArchiveMonth 表
+    文章保存和删除时计数会自动维护，用 update 等不触发信号的方式修改了发表时间后需要运行此命令"""
+    help = '重新统计每个月的文章数'
+
+    def handle(self, *args, **options):
+        count = rebuild_archive_months()
+        invalidate_sidebar()
+        self.stdout.write('已统计 %d 个月份' % count)
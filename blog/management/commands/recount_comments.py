@@ -0,0 +1,19 @@
+from django.core.management.base import BaseCommand
+
+from comments.counts import recount_all
+from comments.fragments import invalidate_comment_list
+
+# 重新统计文章的评论数
+
+
+class Command(BaseCommand):
+    """从评论表重新统计每篇文章的评论数和最后评论时间，修正 comment_count 和 last_commented_time
+    提交和删除评论时会自动维护，用 update 或直接写数据库修改了评论后需要运行此命令
+    修正后清除这些文章的评论列表缓存，缓存中的评论列表和评论数随之更新"""
+    help = '重新统计文章的评论数和最后评论时间'
+
+    def handle(self, *args, **options):
+        updated = recount_all()
+        for pk in updated:
+            invalidate_comment_list(pk)
+        self.stdout.write('已修正 %d 篇文章的评论数' % len(updated))
@@ -0,0 +1,17 @@
+from django.core.management.base import BaseCommand
+
+from blog.post_counts import recount_all
+from blog.sidebar import invalidate_sidebar
+
+# 重新统计分类和标签的文章数
+
+
+class Command(BaseCommand):
+    """从文章表重新统计每个分类和标签的文章数，修正 post_count
+    文章保存、删除和修改标签时计数会自动维护，用 update 或直接写数据库修改了分类、标签后需要运行此命令"""
+    help = '重新统计分类和标签的文章数'
+
+    def handle(self, *args, **options):
+        updated = recount_all()
+        invalidate_sidebar()
+        self.stdout.write('已修正 %d 个分类和标签的文章数' % updated)
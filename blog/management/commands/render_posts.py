@@ -0,0 +1,29 @@
+from django.core.management.base import BaseCommand
+
+from blog.models import Post
+
+# 回填文章的预渲染正文
+
+
+class Command(BaseCommand):
+    """为已有文章渲染 body_html 和 toc
+    默认只处理尚未渲染的文章，--all 则全部重新渲染（例如修改了 Markdown 拓展配置之后）
+    使用 update 直接写入，不会修改 modified_time，也不会触发 save 相关的信号"""
+    help = '渲染并保存文章的正文 HTML 和目录'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--all', action='store_true', dest='all', default=False,
+                            help='重新渲染全部文章，而不仅是尚未渲染的文章')
+
+    def handle(self, *args, **options):
+        posts = Post.objects.all()
+        if not options['all']:
+            posts = posts.filter(body_html='')
+
+        count = 0
+        for post in posts.only('id', 'body').iterator():
+            post.render_body()
+            Post.objects.filter(pk=post.pk).update(body_html=post.body_html, toc=post.toc)
+            count += 1
+
+        self.stdout.write('已渲染 %d 篇文章' % count)
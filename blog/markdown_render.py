@@ -0,0 +1,99 @@
+import hashlib
+import json
+
+import markdown
+from django.conf import settings
+from django.core.cache import caches
+from django.utils.encoding import force_bytes
+from django.utils.text import slugify
+
+from .utils import LRUCache
+
+# Markdown 渲染相关代码
+
+"""文章正文的渲染服务
+详情页、自动摘要和 RSS 都通过这里渲染正文，三处共用同一份结果
+渲染结果以 “源文本 + 拓展配置” 的哈希为键缓存两级：
+    1. 进程内的 LRU 缓存，命中时不需要任何 IO
+    2. Django 的缓存框架，多个 worker 进程共享同一份渲染结果
+正文在 Post.save 时渲染一次，结果（HTML 正文和目录）和文章一起存入数据库"""
+
+# 正文使用的拓展及其配置
+BODY_EXTENSIONS = [
+    'markdown.extensions.extra',  # 多种拓展
+    'markdown.extensions.codehilite',  # 语法高亮拓展
+    'markdown.extensions.toc',  # 自动生成目录拓展
+]
+BODY_EXTENSION_CONFIGS = {
+    'markdown.extensions.toc': {'slugify': slugify},
+}
+
+
+def _describe(value):
+    """把拓展配置中的值转为可哈希的文本，函数等对象用其完整的导入路径表示"""
+    if callable(value):
+        return '%s.%s' % (value.__module__, getattr(value, '__qualname__', value.__name__))
+    return repr(value)
+
+
+class MarkdownRenderer(object):
+    """带缓存的 Markdown 渲染器
+    同一个渲染器的拓展配置固定，因此缓存键只需要源文本的哈希加上配置的哈希"""
+
+    def __init__(self, extensions, extension_configs=None, max_entries=None,
+                 cache_alias=None, timeout=None, key_prefix='markdown'):
+        options = getattr(settings, 'MARKDOWN_RENDER_CACHE', {})
+        self.extensions = list(extensions)
+        self.extension_configs = extension_configs or {}
+        self.cache_alias = cache_alias or options.get('CACHE_ALIAS', 'default')
+        self.timeout = timeout if timeout is not None else options.get('TIMEOUT', 60 * 60 * 24 * 7)
+        self.local_cache = LRUCache(max_entries or options.get('MAX_ENTRIES', 128))
+
+        config = json.dumps({
+            'extensions': self.extensions,
+            'configs': {name: {key: _describe(value) for key, value in config.items()}
+                        for name, config in self.extension_configs.items()},
+        }, sort_keys=True)
+        self.key_prefix = '%s:%s' % (key_prefix, hashlib.sha1(force_bytes(config)).hexdigest()[:12])
+
+    @property
+    def shared_cache(self):
+        return caches[self.cache_alias]
+
+    def make_key(self, text):
+        return '%s:%s' % (self.key_prefix, hashlib.sha1(force_bytes(text)).hexdigest())
+
+    def convert(self, text):
+        """实际执行渲染，每次渲染都需要一个新的 Markdown 实例（toc 等拓展带有状态）"""
+        md = markdown.Markdown(extensions=self.extensions,
+                               extension_configs=self.extension_configs)
+        html = md.convert(text)
+        return {'html': html, 'toc': getattr(md, 'toc', '')}
+
+    def render(self, text):
+        """渲染 text，依次查找进程内缓存、共享缓存，都未命中才真正渲染
+        :return: {'html': 渲染后的 HTML, 'toc': 目录}
+        """
+        key = self.make_key(text)
+        result = self.local_cache.get(key)
+        if result is not None:
+            return result
+
+        result = self.shared_cache.get(key)
+        if result is None:
+            result = self.convert(text)
+            self.shared_cache.set(key, result, self.timeout)
+
+        self.local_cache.set(key, result)
+        return result
+
+
+body_renderer = MarkdownRenderer(BODY_EXTENSIONS, BODY_EXTENSION_CONFIGS, key_prefix='markdown:body')
+
+
+def render_body(text):
+    """渲染文章正文
+    :return: (html, toc) —— 渲染后的 HTML 正文和目录
+    """
+    result = body_renderer.render(text)
+    return result['html'], result['toc']
@@ -0,0 +1,27 @@
+# -*- coding: utf-8 -*-
+# Generated by Django 1.11.29 on 2026-10-18 19:13
+from __future__ import unicode_literals
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('blog', '0006_relatedpost'),
+    ]
+
+    operations = [
+        migrations.AlterModelOptions(
+            name='post',
+            options={'ordering': ['-created_time', '-title'], 'verbose_name': '文章', 'verbose_name_plural': '文章'},
+        ),
+        migrations.AddIndex(
+            model_name='post',
+            index=models.Index(fields=['created_time', 'title'], name='blog_post_created_title_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='post',
+            index=models.Index(fields=['category', 'created_time', 'title'], name='blog_post_cat_created_idx'),
+        ),
+    ]
@@ -0,0 +1,46 @@
+# -*- coding: utf-8 -*-
+# Generated by Django 1.10.8 on 2026-10-18 19:16
+from __future__ import unicode_literals
+
+import datetime
+from collections import Counter
+
+from django.db import migrations, models
+from django.utils import timezone
+
+
+def populate_archive_months(apps, schema_editor):
+    """按已有文章统计每个月的文章数"""
+    Post = apps.get_model('blog', 'Post')
+    ArchiveMonth = apps.get_model('blog', 'ArchiveMonth')
+    counts = Counter()
+    for created_time in Post.objects.values_list('created_time', flat=True).iterator():
+        if timezone.is_aware(created_time):
+            created_time = timezone.localtime(created_time)
+        counts[datetime.date(created_time.year, created_time.month, 1)] += 1
+    ArchiveMonth.objects.bulk_create([ArchiveMonth(month=month, post_count=count)
+                                      for month, count in counts.items()])
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('blog', '0007_post_list_indexes'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='ArchiveMonth',
+            fields=[
+                ('id', models.AutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('month', models.DateField(unique=True, verbose_name='月份')),
+                ('post_count', models.IntegerField(default=0, verbose_name='文章数')),
+            ],
+            options={
+                'verbose_name': '归档月份',
+                'verbose_name_plural': '归档月份',
+                'ordering': ['-month'],
+            },
+        ),
+        migrations.RunPython(populate_archive_months, migrations.RunPython.noop),
+    ]
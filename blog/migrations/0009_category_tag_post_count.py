@@ -0,0 +1,35 @@
+# -*- coding: utf-8 -*-
+# Generated by Django 1.10.8 on 2026-10-18 19:18
+from __future__ import unicode_literals
+
+from django.db import migrations, models
+from django.db.models import Count
+
+
+def populate_post_counts(apps, schema_editor):
+    """按已有文章统计每个分类和标签的文章数"""
+    for model_name in ('Category', 'Tag'):
+        model = apps.get_model('blog', model_name)
+        for obj in model.objects.annotate(num_posts=Count('post')):
+            model.objects.filter(pk=obj.pk).update(post_count=obj.num_posts)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('blog', '0008_archivemonth'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='category',
+            name='post_count',
+            field=models.IntegerField(db_index=True, default=0, editable=False, verbose_name='文章数'),
+        ),
+        migrations.AddField(
+            model_name='tag',
+            name='post_count',
+            field=models.IntegerField(db_index=True, default=0, editable=False, verbose_name='文章数'),
+        ),
+        migrations.RunPython(populate_post_counts, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,37 @@
+# -*- coding: utf-8 -*-
+# Generated by Django 1.10.8 on 2026-10-18 19:52
+from __future__ import unicode_literals
+
+from django.db import migrations, models
+from django.db.models import Count, Max
+
+
+def populate_comment_counts(apps, schema_editor):
+    """按已有评论统计每篇文章的评论数和最后评论时间"""
+    Post = apps.get_model('blog', 'Post')
+    posts = Post.objects.annotate(num_comments=Count('comment'), last_comment=Max('comment__created_time'))
+    for post in posts.filter(num_comments__gt=0).values('pk', 'num_comments', 'last_comment'):
+        Post.objects.filter(pk=post['pk']).update(comment_count=post['num_comments'],
+                                                  last_commented_time=post['last_comment'])
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('blog', '0009_category_tag_post_count'),
+        ('comments', '0001_initial'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='post',
+            name='comment_count',
+            field=models.PositiveIntegerField(default=0, editable=False, verbose_name='评论数'),
+        ),
+        migrations.AddField(
+            model_name='post',
+            name='last_commented_time',
+            field=models.DateTimeField(blank=True, editable=False, null=True, verbose_name='最后评论时间'),
+        ),
+        migrations.RunPython(populate_comment_counts, migrations.RunPython.noop),
+    ]
@@ -1,14 +1,16 @@
-import markdown
 from django.db import models
 from django.urls import reverse
 from django.utils.html import strip_tags
 from django.contrib.auth.models import User
 
+from . import markdown_render
+from .counters import view_counter
+
 # Create your models here.  ——创建文章数据表
 
 
 class Category(models.Model):
-    """数据表：Category（分类）—— 数据列：name
+    """数据表：Category（分类）—— 数据列：name、post_count（文章数）
     Django 要求模型必须继承 models.Model 类
     Category 只需要一个列 name 即可
     CharField 指定了列 name 的数据类型为字符型，最大长度为100
@@ -17,6 +19,9 @@ class Category(models.Model):
     """
     name = models.CharField(max_length=100, verbose_name='分类')
 
+    # 分类下的文章数，由信号维护（见 post_counts.py），侧边栏直接读取
+    post_count = models.IntegerField(default=0, db_index=True, editable=False, verbose_name='文章数')
+
     def __str__(self):
         return self.name
 
@@ -26,9 +31,12 @@ class Category(models.Model):
 
 
 class Tag(models.Model):
-    """数据表：Tag（标签）—— 数据列：name"""
+    """数据表：Tag（标签）—— 数据列：name、post_count（文章数）"""
     name = models.CharField(max_length=100, verbose_name='标签')
 
+    # 标签下的文章数，由信号维护（见 post_counts.py），侧边栏直接读取
+    post_count = models.IntegerField(default=0, db_index=True, editable=False, verbose_name='文章数')
+
     def __str__(self):
         return self.name
 
@@ -37,6 +45,17 @@ class Tag(models.Model):
         verbose_name_plural = "标签"
 
 
+class PostQuerySet(models.QuerySet):
+    """文章的查询集"""
+
+    def for_list(self):
+        """文章列表页使用的查询集
+        select_related 在同一条查询中取出分类和作者，评论数直接读取 comment_count 字段
+        列表页只显示摘要，因此不取出正文相关的大字段
+        这样无论每页显示多少篇文章，渲染列表都只需要固定数量的查询"""
+        return self.select_related('category', 'author').defer('body', 'body_html', 'toc')
+
+
 class Post(models.Model):
     """数据表：Post（文章）
        数据列：title —— 文章标题
@@ -44,7 +63,11 @@ class Post(models.Model):
               created_time —— 文章的创建时间
               modified_time —— 文章最后修改时间
               excerpt —— 文章摘要
+              body_html —— 预渲染的正文 HTML
+              toc —— 预渲染的文章目录
               views —— 阅读量
+              comment_count —— 评论数
+              last_commented_time —— 最后评论时间
             category —— 将 Category（分类）数据表与 Post（文章）数据表进行关联（一对多）
             tags —— 将 Tag（标签）数据表与 Post（文章）数据表进行关联（多对多）
             author —— 文章作者（一对多）
@@ -58,6 +81,10 @@ class Post(models.Model):
     默认情况下字段CharField要求必须存入数据，指定其参数blank=True即可允许空值'''
     excerpt = models.CharField(max_length=20, blank=True, verbose_name='摘要')
 
+    '''预渲染的正文 HTML 和目录，在 body 改变时由 save 方法重新生成，不在后台编辑'''
+    body_html = models.TextField(blank=True, editable=False, verbose_name='正文HTML')
+    toc = models.TextField(blank=True, editable=False, verbose_name='目录')
+
     # 使用字段DateTimeField存储时间
     created_time = models.DateTimeField(verbose_name='建立时间')
     modified_time = models.DateTimeField(verbose_name='最后修改时间')
@@ -65,6 +92,10 @@ class Post(models.Model):
     '''新增 views 字段记录阅读量：该类型值只能为0或正整数，初始化为0'''
     views = models.PositiveIntegerField(default=0, verbose_name='阅读量')
 
+    '''评论数和最后评论时间，由评论的信号维护（见 comments/counts.py），列表页不再联结评论表统计'''
+    comment_count = models.PositiveIntegerField(default=0, editable=False, verbose_name='评论数')
+    last_commented_time = models.DateTimeField(null=True, blank=True, editable=False, verbose_name='最后评论时间')
+
     '''规定一篇文章只能对应一个分类，但一个分类下可以有多篇文章，所以使用ForeignKey（一对多）的关联关系
     规定一篇文章可以有多个标签，一个标签下也可能有多篇文章，所以使用ManyToManyField（多对多）关联关系
     规定文章可以没有标签，因此为标签Tag指定blank=True'''
@@ -76,9 +107,30 @@ class Post(models.Model):
     通过ForeignKey一对多的将作者 User 和 Post 文章关联起来'''
     author = models.ForeignKey(User, verbose_name='作者')
 
+    objects = PostQuerySet.as_manager()
+
     def __str__(self):
         return self.title
 
+    @classmethod
+    def from_db(cls, db, field_names, values):
+        """从数据库加载时记下原始的 body，以便 save 时判断正文是否被修改"""
+        instance = super(Post, cls).from_db(db, field_names, values)
+        instance._loaded_body = instance.__dict__.get('body')
+        instance._loaded_created_time = instance.__dict__.get('created_time')
+        instance._loaded_category_id = instance.__dict__.get('category_id')
+        return instance
+
+    def body_changed(self):
+        """正文是否需要重新渲染：新建的文章、body 被修改或尚未渲染过"""
+        if 'body' in self.get_deferred_fields():
+            return False
+        return not self.body_html or self.body != getattr(self, '_loaded_body', None)
+
+    def render_body(self):
+        """渲染 body，将 HTML 正文和目录保存到 body_html 和 toc 字段"""
+        self.body_html, self.toc = markdown_render.render_body(self.body)
+
     def get_absolute_url(self):
         """屏蔽域名，生成纯净的URL
         :return: reverse()
@@ -94,23 +146,34 @@ class Post(models.Model):
         return reverse('blog:detail', kwargs={'pk': self.pk})
 
     def increase_views(self):
-        """ increase_views 方法首先将自身对应的 views 字段值 +1
-        然后将变化更新到数据库，使用 update_fields 参数指定只更新 views字段来提高效率"""
-        self.views += 1
-        self.save(update_fields=['views'])
+        """ increase_views 方法将文章阅读量 +1
+        增量先缓冲在内存中，由 view_counter 定时批量写入数据库
+        写入使用 F('views') + n，并发访问时也不会丢失计数"""
+        view_counter.incr(self.pk)
+
+    @property
+    def views_count(self):
+        """当前阅读量：数据库中的 views 加上尚未写入数据库的增量"""
+        return self.views + view_counter.pending(self.pk)
 
     def save(self, *args, **kwargs):
-        """如果没有填写文章摘要则自动生成，调用此方法前写的文章不生效"""
+        """如果没有填写文章摘要则自动生成，调用此方法前写的文章不生效
+        只有 body 改变时才重新渲染正文
+        如果指定了 update_fields（例如只更新 views），且其中不含 body，则跳过渲染"""
+        update_fields = kwargs.get('update_fields')
+        if (update_fields is None or 'body' in update_fields) and self.body_changed():
+            self.render_body()
+            if update_fields is not None:
+                kwargs['update_fields'] = set(update_fields) | {'body_html', 'toc'}
+
         if not self.excerpt:
-            # 将 body 中的 Markdown 文本转为 HTML 文本
-            md = markdown.Markdown(extensions=[
-                'markdown.extensions.extra',
-                'markdown.extensions.codehilite',
-            ])
-            # 去掉 HTML 文本里的 HTML 标签，取前26个字符作为摘要
-            self.excerpt = strip_tags(md.convert(self.body))[:2]
+            # 摘要和正文共用同一份渲染结果，去掉 HTML 文本里的 HTML 标签，取前26个字符作为摘要
+            body_html = self.body_html or markdown_render.render_body(self.body)[0]
+            self.excerpt = strip_tags(body_html)[:2]
+
         # 调用父类的 save 方法将数据保存到数据库中
         super(Post, self).save(*args, **kwargs)
+        self._loaded_body = self.__dict__.get('body')
 
     class Meta:
         """ Django 允许在models.Model的子类里定义一个Meta内部类
@@ -123,4 +186,50 @@ class Post(models.Model):
             这样指定以后所有返回的文章列表都会自动按照 Meta 中指定的顺序排序'''
         verbose_name = "文章"
         verbose_name_plural = "文章"
-        ordering = ['-created_time', 'title']
+        ordering = ['-created_time', '-title']
+        # 与列表页的排序和筛选对应的联合索引，列表页按索引范围扫描（见 pagination.py）
+        # 排序的各列都是降序，数据库反向扫描升序的索引即可，MySQL 5.7 不支持降序索引也能用上
+        indexes = [
+            models.Index(fields=['created_time', 'title'], name='blog_post_created_title_idx'),
+            models.Index(fields=['category', 'created_time', 'title'], name='blog_post_cat_created_idx'),
+        ]
+
+
+class RelatedPost(models.Model):
+    """数据表：RelatedPost（相关文章）
+       数据列：post —— 文章
+              related —— 与之相关的文章
+              score —— 全文索引给出的相似度
+              rank —— 相关文章的排名，从 0 开始
+    每篇文章的相关文章预先由 more_like_this 计算好（见 related.py）
+    详情页只需一条按 post 索引的查询即可取出"""
+    post = models.ForeignKey(Post, related_name='related_links', verbose_name='文章')
+    related = models.ForeignKey(Post, related_name='+', verbose_name='相关文章')
+    score = models.FloatField(default=0, verbose_name='相似度')
+    rank = models.PositiveSmallIntegerField(default=0, verbose_name='排名')
+
+    def __str__(self):
+        return '%s -> %s' % (self.post_id, self.related_id)
+
+    class Meta:
+        verbose_name = "相关文章"
+        verbose_name_plural = "相关文章"
+        ordering = ['post_id', 'rank']
+        unique_together = [('post', 'rank')]
+
+
+class ArchiveMonth(models.Model):
+    """数据表：ArchiveMonth（归档月份）
+       数据列：month —— 月份，保存为这个月的第一天
+              post_count —— 这个月发表的文章数
+    由文章的保存和删除维护（见 archives.py），侧边栏的归档直接读取这张表"""
+    month = models.DateField(unique=True, verbose_name='月份')
+    post_count = models.IntegerField(default=0, verbose_name='文章数')
+
+    def __str__(self):
+        return '%d 年 %d 月' % (self.month.year, self.month.month)
+
+    class Meta:
+        verbose_name = "归档月份"
+        verbose_name_plural = "归档月份"
+        ordering = ['-month']
@@ -0,0 +1,100 @@
+import uuid
+
+from django.core.cache import cache
+from django.core.paginator import Paginator
+from django.db.models import Q
+from django.utils.functional import cached_property
+
+# 文章列表的分页
+
+"""Paginator 每次都要执行一次 COUNT(*) 计算总页数，并用 OFFSET 取出某一页
+OFFSET 需要数据库先扫描并丢弃前面的全部行，越往后翻页越慢
+PostPaginator 做了两点改进：
+    1. 总数放入缓存，文章或文章的标签改变时（见 signals.py）全部失效
+    2. keyset 模式下，上一页/下一页的链接带上本页第一篇/最后一篇文章的 pk（before/after）
+       按 (created_time, title, pk) 从这篇文章开始做范围查询，每一页都是一次索引范围扫描
+       直接跳到某一页的链接仍然使用 OFFSET
+列表统一按 LIST_ORDERING 排序，和 Post.Meta.ordering 一致，最后用 pk 保证顺序唯一
+各列方向相同，ORDER BY 可以直接反向扫描 (created_time, title) 索引（InnoDB 的二级索引末尾带有主键）"""
+
+LIST_ORDERING = ('-created_time', '-title', '-pk')
+REVERSE_ORDERING = ('created_time', 'title', 'pk')
+
+COUNT_VERSION_KEY = 'blog:post_count_version'
+
+
+def get_count_version():
+    """文章总数缓存的版本号，版本号改变后旧的总数全部失效"""
+    version = cache.get(COUNT_VERSION_KEY)
+    if version is None:
+        cache.add(COUNT_VERSION_KEY, uuid.uuid4().hex, None)
+        version = cache.get(COUNT_VERSION_KEY)
+    return version
+
+
+def invalidate_post_counts():
+    """清除全部列表的文章总数缓存"""
+    cache.set(COUNT_VERSION_KEY, uuid.uuid4().hex, None)
+
+
+def keyset_filter(boundary, after=True):
+    """排在 boundary（created_time, title, pk）之后（after=False 时为之前）的文章"""
+    created_time, title, pk = boundary
+    if after:
+        return (Q(created_time__lt=created_time) |
+                Q(created_time=created_time, title__lt=title) |
+                Q(created_time=created_time, title=title, pk__lt=pk))
+    return (Q(created_time__gt=created_time) |
+            Q(created_time=created_time, title__gt=title) |
+            Q(created_time=created_time, title=title, pk__gt=pk))
+
+
+class PostPaginator(Paginator):
+    """文章列表的分页器
+    count_key 为列表的缓存键（例如 'category:1'），为 None 时不缓存总数
+    keyset 为 True 且给出了 after 或 before 时按游标取出这一页"""
+
+    def __init__(self, object_list, per_page, count_key=None, keyset=False, after=None, before=None, **kwargs):
+        super(PostPaginator, self).__init__(object_list.order_by(*LIST_ORDERING), per_page, **kwargs)
+        self.count_key = count_key
+        self.keyset = keyset
+        self.after = after
+        self.before = before
+
+    @cached_property
+    def count(self):
+        if self.count_key is None:
+            return self.object_list.count()
+
+        key = 'blog:post_count:%s:%s' % (get_count_version(), self.count_key)
+        count = cache.get(key)
+        if count is None:
+            count = self.object_list.count()
+            cache.set(key, count, None)
+        return count
+
+    def page(self, number):
+        number = self.validate_number(number)
+        object_list = self.keyset_page() if self.keyset else None
+        if object_list is None:
+            return super(PostPaginator, self).page(number)
+        return self._get_page(object_list, number, self)
+
+    def keyset_page(self):
+        """按游标取出一页文章，游标无效（例如文章已删除）时返回 None，改用 OFFSET"""
+        cursor, after = (self.after, True) if self.after else (self.before, False)
+        try:
+            pk = int(cursor)
+        except (TypeError, ValueError):
+            return None
+
+        boundary = self.object_list.model.objects.filter(pk=pk).values_list('created_time', 'title', 'pk').first()
+        if boundary is None:
+            return None
+
+        if after:
+            return list(self.object_list.filter(keyset_filter(boundary))[:self.per_page])
+        object_list = list(self.object_list.filter(keyset_filter(boundary, after=False))
+                           .order_by(*REVERSE_ORDERING)[:self.per_page])
+        object_list.reverse()
+        return object_list
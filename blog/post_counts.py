@@ -0,0 +1,35 @@
+from django.db.models.aggregates import Count
+
+from .models import Post, Category, Tag
+
+# 分类和标签的文章数
+
+"""侧边栏的分类和标签云原来每次都用 annotate(Count('post')) 联结文章表（标签还要联结多对多的中间表）分组统计
+现在文章数保存在 Category.post_count 和 Tag.post_count 中，侧边栏只需 WHERE post_count > 0 一次索引读取
+文章的分类或标签改变时（见 signals.py）只重新统计受影响的分类和标签，每个都是一次按外键索引的 COUNT
+计数有偏差时可以运行 recount_posts 命令全部重新统计"""
+
+
+def recount_categories(pks):
+    """重新统计 pks 中各分类的文章数"""
+    for pk in set(pks):
+        if pk is not None:
+            Category.objects.filter(pk=pk).update(post_count=Post.objects.filter(category_id=pk).count())
+
+
+def recount_tags(pks):
+    """重新统计 pks 中各标签的文章数"""
+    through = Post.tags.through
+    for pk in set(pks):
+        Tag.objects.filter(pk=pk).update(post_count=through.objects.filter(tag_id=pk).count())
+
+
+def recount_all():
+    """用两次分组查询重新统计全部分类和标签的文章数，只更新计数不一致的记录，返回更新的记录数"""
+    updated = 0
+    for model in (Category, Tag):
+        for obj in model.objects.annotate(num_posts=Count('post')).only('id', 'post_count'):
+            if obj.post_count != obj.num_posts:
+                model.objects.filter(pk=obj.pk).update(post_count=obj.num_posts)
+                updated += 1
+    return updated
@@ -0,0 +1,58 @@
+from django.conf import settings
+from django.db import transaction
+from haystack import connections
+
+from .models import Post, RelatedPost
+
+# 预先计算的相关文章
+
+"""more_like_this 每次调用都要在索引中找到文章、提取关键词再检索一遍
+详情页如果每次都调用，每次阅读都要付出这些代价
+因此每篇文章的前 RELATED_POSTS_NUM 篇相关文章在写入索引后计算好，保存到 RelatedPost 表中：
+    1. 文章写入索引后由 search_signals.index_queue 的监听函数重新计算
+    2. 新文章可能成为其它文章的相关文章，可以定期运行 build_related_posts 全部重新计算"""
+
+
+def get_related_num():
+    return getattr(settings, 'RELATED_POSTS_NUM', 5)
+
+
+def compute_related(post, using='default', num=None):
+    """用全文索引找出与 post 最相似的 num 篇文章，返回 [(pk, score), ...]"""
+    num = num or get_related_num()
+    results = connections[using].get_backend().more_like_this(post, end_offset=num)
+    return [(int(result.pk), result.score) for result in results['results'][:num]]
+
+
+def update_related(posts, using='default', num=None):
+    """重新计算 posts 的相关文章，替换 RelatedPost 表中原有的记录，返回写入的记录数"""
+    posts = list(posts)
+    candidates = [(post, compute_related(post, using, num)) for post in posts]
+
+    # 索引中可能还有已删除文章的残留，只保存数据库中存在的文章，排名按保存的文章重新编号
+    related_pks = {pk for post, related in candidates for pk, score in related}
+    existing = set(Post.objects.filter(pk__in=related_pks).values_list('pk', flat=True))
+    links = []
+    for post, related in candidates:
+        related = [(pk, score) for pk, score in related if pk in existing]
+        for rank, (pk, score) in enumerate(related):
+            links.append(RelatedPost(post_id=post.pk, related_id=pk, score=score, rank=rank))
+
+    with transaction.atomic():
+        RelatedPost.objects.filter(post__in=[post.pk for post in posts]).delete()
+        RelatedPost.objects.bulk_create(links)
+    return len(links)
+
+
+def get_related_posts(post):
+    """取出 post 的相关文章，只需一次查询"""
+    links = RelatedPost.objects.filter(post_id=post.pk).select_related('related').only(
+        'rank', 'score', 'post_id', 'related__id', 'related__title', 'related__created_time')
+    return [link.related for link in links]
+
+
+def on_index_updated(using, model, objects, removed):
+    """index_queue 的监听函数：文章写入索引后重新计算这些文章的相关文章
+    删除的文章对应的记录随外键级联删除"""
+    if model is Post and objects:
+        update_related(objects, using)
@@ -22,6 +22,9 @@ class PostIndex(indexes.SearchIndex, indexes.Indexable):
     """
     text = indexes.CharField(document=True, use_template=True)
 
+    # 索引内容（见数据模板）来源的模型字段，只修改了其它字段（例如 views）的 save 不需要更新索引
+    source_fields = ('title', 'body')
+
     def get_model(self):
         return Post
 
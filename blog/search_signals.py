@@ -0,0 +1,194 @@
+import atexit
+import logging
+import threading
+
+from django.conf import settings
+from django.db import connection, models, transaction
+from haystack.exceptions import NotHandled
+from haystack.signals import BaseSignalProcessor
+from haystack.utils import get_identifier
+
+# 搜索索引的异步更新
+
+"""RealtimeSignalProcessor 在每次 save 时同步地用 jieba 分词并提交一个 Whoosh 段
+写索引要抢索引的写锁，请求的耗时因此取决于索引写入
+QueuedSignalProcessor 只把需要更新的文章记入队列，由后台线程批量写入索引：
+    1. 只修改了不影响索引的字段（例如 views）的 save 直接忽略
+    2. 同一篇文章在写入前被多次修改时只写入一次
+    3. 队列中的改动等待 SEARCH_INDEX_QUEUE_DELAY 秒，期间的改动合并为一批，用一个写入器提交
+    4. 写入索引失败的一批改动放回队列，等待下次写入，不会丢失"""
+
+logger = logging.getLogger(__name__)
+
+UPDATE = 'update'
+REMOVE = 'remove'
+
+
+class IndexUpdateQueue(object):
+    """待写入索引的改动队列
+    键为 (连接名, 模型, pk)，同一个对象只保留最后一次改动"""
+
+    def __init__(self, delay=None):
+        self.delay = delay
+        self._pending = {}
+        self._lock = threading.Lock()
+        self._timer = None
+        self._listeners = []
+
+    def get_delay(self):
+        if self.delay is not None:
+            return self.delay
+        return getattr(settings, 'SEARCH_INDEX_QUEUE_DELAY', 2)
+
+    def put(self, using, model, pk, action, identifier):
+        with self._lock:
+            self._pending[(using, model, pk)] = (action, identifier)
+            process_now = self.get_delay() <= 0
+            if not process_now:
+                self._schedule()
+
+        if process_now:
+            self.process()
+
+    def _schedule(self):
+        """启动后台定时器，调用时需持有 self._lock"""
+        if self._timer is None:
+            self._timer = threading.Timer(self.get_delay(), self._process_in_background)
+            self._timer.daemon = True
+            self._timer.start()
+
+    def _requeue(self, entries):
+        """把写入失败的改动放回队列，期间又有新改动的对象以新改动为准"""
+        with self._lock:
+            for key, value in entries.items():
+                self._pending.setdefault(key, value)
+            if self.get_delay() > 0:
+                self._schedule()
+
+    def __len__(self):
+        with self._lock:
+            return len(self._pending)
+
+    def connect(self, listener):
+        """注册监听函数，每批改动写入索引后调用 listener(using, model, objects, removed)
+        objects 为写入索引的对象，removed 为从索引中删除的 pk"""
+        if listener not in self._listeners:
+            self._listeners.append(listener)
+
+    def disconnect(self, listener):
+        if listener in self._listeners:
+            self._listeners.remove(listener)
+
+    def process(self):
+        """把队列中的全部改动写入索引，每个连接的每个模型一批"""
+        from haystack import connections
+
+        with self._lock:
+            pending, self._pending = self._pending, {}
+            if self._timer is not None:
+                self._timer.cancel()
+                self._timer = None
+
+        batches = {}
+        for (using, model, pk), (action, identifier) in pending.items():
+            updates, removals, entries = batches.setdefault((using, model), ({}, {}, {}))
+            if action == UPDATE:
+                updates[pk] = identifier
+            else:
+                removals[pk] = identifier
+            entries[(using, model, pk)] = (action, identifier)
+
+        for (using, model), (updates, removals, entries) in batches.items():
+            try:
+                index = connections[using].get_unified_index().get_index(model)
+            except NotHandled:
+                continue
+            backend = connections[using].get_backend()
+
+            try:
+                objects = []
+                if updates:
+                    objects = list(index.index_queryset(using=using).filter(pk__in=list(updates)))
+                    # 已不在 index_queryset 中的对象需要从索引中删除
+                    for obj in objects:
+                        updates.pop(obj.pk, None)
+                    removals.update(updates)
+                    if objects:
+                        backend.update(index, objects)
+
+                for identifier in removals.values():
+                    backend.remove(identifier)
+            except Exception:
+                # 写入失败时把这一批改动放回队列，等待下次写入
+                logger.exception('Failed to update search index for %d %s objects, requeued',
+                                 len(entries), model._meta.label)
+                self._requeue(entries)
+                continue
+
+            for listener in self._listeners:
+                try:
+                    listener(using, model, objects, list(removals))
+                except Exception:
+                    logger.exception('Search index listener %r failed', listener)
+
+        return len(pending)
+
+    def _process_in_background(self):
+        with self._lock:
+            self._timer = None
+        try:
+            self.process()
+        except Exception:
+            logger.exception('Failed to apply queued search index updates')
+        finally:
+            # 后台线程用完数据库连接后需要自行关闭
+            connection.close()
+
+
+index_queue = IndexUpdateQueue()
+
+
+@atexit.register
+def _process_on_exit():
+    """进程退出前写入队列中剩余的改动"""
+    try:
+        index_queue.process()
+    except Exception:
+        logger.exception('Failed to apply queued search index updates on exit')
+
+
+class QueuedSignalProcessor(BaseSignalProcessor):
+    """把模型的 save/delete 记入 index_queue，由后台线程批量更新索引
+    改动在事务提交后才入队，后台线程读取到的一定是已提交的数据"""
+
+    def setup(self):
+        models.signals.post_save.connect(self.handle_save)
+        models.signals.post_delete.connect(self.handle_delete)
+
+    def teardown(self):
+        models.signals.post_save.disconnect(self.handle_save)
+        models.signals.post_delete.disconnect(self.handle_delete)
+
+    def handle_save(self, sender, instance, update_fields=None, **kwargs):
+        self.enqueue(sender, instance, UPDATE, update_fields=update_fields)
+
+    def handle_delete(self, sender, instance, **kwargs):
+        self.enqueue(sender, instance, REMOVE)
+
+    def enqueue(self, sender, instance, action, update_fields=None):
+        for using in self.connection_router.for_write(instance=instance):
+            try:
+                index = self.connections[using].get_unified_index().get_index(sender)
+            except NotHandled:
+                continue
+
+            # 只保存了不影响索引内容的字段，无需更新索引
+            source_fields = getattr(index, 'source_fields', None)
+            if action == UPDATE and update_fields is not None and source_fields is not None:
+                if not set(update_fields) & set(source_fields):
+                    continue
+
+            transaction.on_commit(
+                lambda using=using, pk=instance.pk, identifier=get_identifier(instance):
+                    index_queue.put(using, sender, pk, action, identifier)
+            )
@@ -0,0 +1,42 @@
+from django.core.cache import cache
+
+from .models import Post, Category, Tag, ArchiveMonth
+
+# 侧边栏数据缓存
+
+"""每个页面的侧边栏都要显示最新文章、归档、分类和标签云，需要 4 次查询
+这些数据只在文章、分类或标签改变时才会变化，因此一次查询出来后整体放入缓存
+文章、分类、标签保存或删除时（见 signals.py）清除缓存，下次访问时重新生成"""
+
+SIDEBAR_CACHE_KEY = 'blog:sidebar'
+
+# 缓存中保存的最新文章数
+RECENT_POSTS_NUM = 6
+
+
+def build_sidebar_data():
+    """查询侧边栏需要的全部数据，查询集都转为列表以便放入缓存"""
+    return {
+        # 最新文章只需要标题和链接
+        'recent_posts': list(Post.objects.only('id', 'title', 'created_time')
+                             .order_by('-created_time')[:RECENT_POSTS_NUM]),
+        # 归档月份从按月计数的 ArchiveMonth 表中读取，不需要扫描文章表
+        'archives': list(ArchiveMonth.objects.filter(post_count__gt=0).values_list('month', flat=True)),
+        # 分类和标签的文章数保存在 post_count 中（见 post_counts.py），不需要联结文章表分组统计
+        'categories': list(Category.objects.filter(post_count__gt=0)),
+        'tags': list(Tag.objects.filter(post_count__gt=0)),
+    }
+
+
+def get_sidebar_data():
+    """从缓存中获取侧边栏数据，缓存中没有则重新查询并放入缓存"""
+    data = cache.get(SIDEBAR_CACHE_KEY)
+    if data is None:
+        data = build_sidebar_data()
+        cache.set(SIDEBAR_CACHE_KEY, data, None)
+    return data
+
+
+def invalidate_sidebar():
+    """清除侧边栏缓存"""
+    cache.delete(SIDEBAR_CACHE_KEY)
@@ -0,0 +1,119 @@
+from django.db import transaction
+from django.db.models.signals import post_save, pre_delete, post_delete, m2m_changed
+from django.dispatch import receiver
+
+from .archives import month_of, adjust_month
+from .feeds import invalidate_feed
+from .models import Post, Category, Tag
+from .pagination import invalidate_post_counts
+from .post_counts import recount_categories, recount_tags
+from .sidebar import invalidate_sidebar
+
+# 信号处理函数，在 BlogConfig.ready 中导入以完成注册
+
+
+@receiver(post_save, sender=Post)
+@receiver(post_delete, sender=Post)
+@receiver(post_save, sender=Category)
+def clear_feed_cache(sender, **kwargs):
+    """文章或分类（RSS 条目标题中含有分类名）改变后，清除 RSS 缓存"""
+    invalidate_feed()
+
+
+@receiver(post_save, sender=Post)
+@receiver(post_delete, sender=Post)
+@receiver(m2m_changed, sender=Post.tags.through)
+def clear_post_counts(sender, **kwargs):
+    """文章或文章的标签改变后，清除各列表页缓存的文章总数"""
+    invalidate_post_counts()
+
+
+@receiver(post_save, sender=Post)
+def update_archive_month_on_save(sender, instance, created, update_fields=None, **kwargs):
+    """新文章计入发表月份；修改了发表时间且月份改变时，从原来的月份移到新的月份"""
+    if update_fields is not None and 'created_time' not in update_fields:
+        return
+    if 'created_time' in instance.get_deferred_fields():
+        return
+
+    month = month_of(instance.created_time)
+    loaded_created_time = getattr(instance, '_loaded_created_time', None)
+    if created:
+        adjust_month(month, 1)
+    elif loaded_created_time is not None and month_of(loaded_created_time) != month:
+        adjust_month(month_of(loaded_created_time), -1)
+        adjust_month(month, 1)
+    instance._loaded_created_time = instance.created_time
+
+
+@receiver(post_delete, sender=Post)
+def update_archive_month_on_delete(sender, instance, **kwargs):
+    """删除的文章从数据库中原来的发表月份减去，发表时间在 pre_delete 中读取（见 remember_relations_on_delete）"""
+    created_time = getattr(instance, '_deleted_created_time', None)
+    if created_time is not None:
+        adjust_month(month_of(created_time), -1)
+
+
+@receiver(post_save, sender=Post)
+def update_category_count_on_save(sender, instance, created, update_fields=None, **kwargs):
+    """新文章或文章换了分类时，重新统计原来的分类和新分类的文章数"""
+    if update_fields is not None and not {'category', 'category_id'} & set(update_fields):
+        return
+    if 'category_id' in instance.get_deferred_fields():
+        return
+
+    loaded_category_id = getattr(instance, '_loaded_category_id', None)
+    if created or loaded_category_id != instance.category_id:
+        recount_categories([loaded_category_id, instance.category_id])
+    instance._loaded_category_id = instance.category_id
+
+
+@receiver(pre_delete, sender=Post)
+def remember_relations_on_delete(sender, instance, **kwargs):
+    """删除文章时多对多中间表的记录会被直接删除，不发送 m2m_changed，因此先记下文章的标签
+    分类和发表时间也从数据库中读取，内存中的 instance 可能已经过时，
+    延迟加载的字段在文章删除后也无法再读取"""
+    rows = list(Post.objects.filter(pk=instance.pk).values_list('category_id', 'created_time'))
+    instance._deleted_category_ids = [category_id for category_id, created_time in rows]
+    instance._deleted_created_time = rows[0][1] if rows else None
+    instance._deleted_tag_ids = list(Post.tags.through.objects.filter(post_id=instance.pk)
+                                     .values_list('tag_id', flat=True))
+
+
+@receiver(post_delete, sender=Post)
+def update_counts_on_delete(sender, instance, **kwargs):
+    """删除文章后，重新统计它所属的分类和标签的文章数"""
+    category_ids = getattr(instance, '_deleted_category_ids', None)
+    if category_ids is None:
+        category_ids = [instance.category_id]
+    recount_categories(category_ids)
+    recount_tags(getattr(instance, '_deleted_tag_ids', []))
+
+
+@receiver(m2m_changed, sender=Post.tags.through)
+def update_tag_counts(sender, instance, action, reverse, pk_set, **kwargs):
+    """文章的标签改变后，重新统计受影响的标签的文章数
+    从标签一侧修改（tag.post_set）时受影响的只有这个标签"""
+    if action == 'pre_clear' and not reverse:
+        instance._cleared_tag_ids = list(instance.tags.values_list('pk', flat=True))
+    elif action in ('post_add', 'post_remove', 'post_clear'):
+        if reverse:
+            recount_tags([instance.pk])
+        elif action == 'post_clear':
+            recount_tags(getattr(instance, '_cleared_tag_ids', []))
+        else:
+            recount_tags(pk_set or [])
+
+
+@receiver(post_save, sender=Post)
+@receiver(post_delete, sender=Post)
+@receiver(post_save, sender=Category)
+@receiver(post_delete, sender=Category)
+@receiver(post_save, sender=Tag)
+@receiver(post_delete, sender=Tag)
+@receiver(m2m_changed, sender=Post.tags.through)
+def clear_sidebar_cache(sender, **kwargs):
+    """文章、分类、标签或文章的标签改变后，清除侧边栏缓存
+    在更新归档月份、分类和标签的文章数之后注册，并且等到事务提交后才清除：
+    否则提交前到来的请求会把旧的数据重新放入缓存，而侧边栏缓存不会过期"""
+    transaction.on_commit(invalidate_sidebar)
@@ -0,0 +1,343 @@
+import heapq
+import logging
+import random
+import threading
+import time
+from bisect import bisect_left, insort
+from collections import defaultdict
+
+from django.core.cache import cache
+from django.db import connection
+
+from .analyzer import get_analyzer
+from .counters import view_counter
+from .models import Post
+
+# 搜索框的输入提示
+
+"""每输入一个字就调用一次全文检索，搜索后端承受不了
+因此把文章标题和 jieba 分出的词放进一个按字母序排列的数组，用二分查找找到以输入内容开头的条目：
+    1. 标题条目直接链接到文章，词条目作为搜索关键词
+    2. 结果按文章的阅读量排序，一个词出现在多篇文章中时取阅读量之和
+       每个词的阅读量之和预先算好，阅读量每 VIEWS_INTERVAL 秒从数据库读取一次，只调整变化的文章所含的词
+    3. 以输入内容开头的条目超过 MAX_SCAN 个的前缀（通常是一两个字），前 TOP_K 个条目预先排好，直接返回
+       其它前缀最多只扫描 MAX_SCAN 个条目，排序在锁外进行
+    4. 前缀索引由后台线程建立和更新，同一时间只有一个线程在写，查询从不等待
+    5. 每个进程各有一份前缀索引，文章的改动记录在共享缓存中，每批改动一个递增的序号：
+       文章写入搜索索引后，处理这批改动的进程记下改动的文章并直接更新自己的前缀索引，
+       其它进程发现序号改变后，在后台只重新分词这些文章；改动记录缺失（过期或缓存被清空）时才全部重新建立"""
+
+logger = logging.getLogger(__name__)
+
+MIN_TERM_LENGTH = 2
+MAX_SCAN = 256
+TOP_K = 10
+VIEWS_INTERVAL = 60
+
+SEQUENCE_KEY = 'blog:suggest_sequence'
+CHANGE_KEY = 'blog:suggest_change:%d'
+CHANGE_TIMEOUT = 60 * 60 * 24
+# 落后的改动超过这个数时直接重新建立
+MAX_CHANGES = 1000
+
+
+def get_sequence():
+    """共享的改动序号，即最后一批改动的序号"""
+    sequence = cache.get(SEQUENCE_KEY)
+    if sequence is None:
+        # 起点随机，缓存被清空后序号不会和各进程记下的旧序号重合
+        cache.add(SEQUENCE_KEY, random.randint(1, 2 ** 30) * MAX_CHANGES, None)
+        sequence = cache.get(SEQUENCE_KEY)
+    return sequence
+
+
+def publish_changes(updated, removed):
+    """把一批改动（更新和删除的文章 pk）记入共享缓存，返回这批改动的序号
+    用 cache.add 占用序号，多个进程同时写入时不会占用同一个序号"""
+    sequence = get_sequence() + 1
+    while not cache.add(CHANGE_KEY % sequence, (list(updated), list(removed)), CHANGE_TIMEOUT):
+        sequence += 1
+    cache.set(SEQUENCE_KEY, sequence, None)
+    return sequence
+
+
+def get_changes(start, end):
+    """取出序号在 (start, end] 之间的改动，合并为 (更新的 pk, 删除的 pk)
+    有改动记录缺失时返回 None"""
+    keys = [CHANGE_KEY % sequence for sequence in range(start + 1, end + 1)]
+    entries = cache.get_many(keys)
+    if len(entries) != len(keys):
+        return None
+
+    actions = {}
+    for key in keys:
+        updated, removed = entries[key]
+        actions.update((pk, True) for pk in updated)
+        actions.update((pk, False) for pk in removed)
+    return ([pk for pk, update in actions.items() if update],
+            [pk for pk, update in actions.items() if not update])
+
+
+def get_views():
+    """全部文章的阅读量 {pk: views}，加上本进程尚未写入数据库的增量"""
+    views = dict(Post.objects.values_list('pk', 'views'))
+    for pk in views:
+        views[pk] += view_counter.pending(pk)
+    return views
+
+
+class SuggestionIndex(object):
+    """前缀索引
+    _keys 为排好序的 (小写的文本, 类型, 值, 文本) 元组，TITLE 类型的值为文章的 pk，TERM 类型的值为词
+    _posts 记录每篇文章的标题和词，_term_posts 记录每个词出现在哪些文章中，用于增量更新
+    _views 为每篇文章的阅读量，_term_views 为每个词所在文章的阅读量之和
+    _top 为匹配条目超过 MAX_SCAN 个的前缀预先排好的前 TOP_K 个条目
+    _sequence 为已应用的共享改动序号
+    所有写操作都持有 _write_lock，_lock 只在修改和读取数据结构的瞬间持有"""
+
+    TITLE = 0
+    TERM = 1
+
+    def __init__(self):
+        self._keys = []
+        self._posts = {}
+        self._term_posts = {}
+        self._views = {}
+        self._term_views = {}
+        self._top = {}
+        self._lock = threading.Lock()
+        self._write_lock = threading.Lock()
+        self._sequence = None
+        self._views_time = 0
+
+    @property
+    def built(self):
+        return self._sequence is not None
+
+    def refresh(self):
+        """前缀索引尚未建立、有新的改动或阅读量已过期时，在后台线程中更新，不阻塞查询"""
+        if self._write_lock.locked():
+            return
+        if self._sequence == get_sequence() and time.time() - self._views_time < VIEWS_INTERVAL:
+            return
+        thread = threading.Thread(target=self._update_in_background)
+        thread.daemon = True
+        thread.start()
+
+    def update(self, blocking=True):
+        """把前缀索引更新到最新：尚未建立时建立，否则按共享的改动记录增量更新，阅读量过期时重新读取
+        blocking 为 False 且有其它线程正在写时直接返回 False"""
+        if not self._write_lock.acquire(blocking=blocking):
+            return False
+        try:
+            if not self._catch_up():
+                self._build()
+            elif time.time() - self._views_time >= VIEWS_INTERVAL:
+                self._refresh_views()
+            self._rerank()
+            return True
+        finally:
+            self._write_lock.release()
+
+    def build(self):
+        """从数据库读取全部文章，重新建立前缀索引"""
+        with self._write_lock:
+            self._build()
+            self._rerank()
+
+    def apply_changes(self, objects, removed):
+        """本进程写入搜索索引的一批改动：记入共享缓存，供其它进程增量更新
+        本进程的前缀索引已应用之前的全部改动时直接更新，否则等待下次查询时补上"""
+        sequence = publish_changes([obj.pk for obj in objects], removed)
+        with self._write_lock:
+            if self._sequence != sequence - 1:
+                return
+            self._remove_posts(removed)
+            self._update_posts(objects)
+            self._sequence = sequence
+            self._rerank()
+
+    def suggest(self, prefix, limit=8):
+        """返回以 prefix 开头的条目，按阅读量降序排列，最多 TOP_K 个
+        每个条目为 {'text': 文本, 'url': 文章地址或 None}"""
+        prefix = prefix.strip().lower()
+        if not prefix:
+            return []
+
+        with self._lock:
+            ranked = self._top.get(prefix)
+            if ranked is None:
+                start = bisect_left(self._keys, (prefix,))
+                entries = self._keys[start:start + MAX_SCAN]
+
+        if ranked is None:
+            # 不在 _top 中的前缀匹配的条目不超过 MAX_SCAN 个，都在 entries 中
+            entries = [entry for entry in entries if entry[0].startswith(prefix)]
+            ranked = heapq.nlargest(limit, entries, key=self._score)
+
+        suggestions = []
+        for key, kind, value, text in ranked[:limit]:
+            url = Post(pk=value).get_absolute_url() if kind == self.TITLE else None
+            suggestions.append({'text': text, 'url': url})
+        return suggestions
+
+    def _update_in_background(self):
+        try:
+            self.update(blocking=False)
+        except Exception:
+            logger.exception('Failed to update the search suggestion index')
+        finally:
+            # 后台线程用完数据库连接后需要自行关闭
+            connection.close()
+
+    def _build(self):
+        # 先取序号：建立期间又有改动时，序号会再变，之后按改动记录补上
+        sequence = get_sequence()
+        views = get_views()
+        entries = [(post.pk, self._entry(post)) for post in Post.objects.only('id', 'title', 'body').iterator()]
+
+        keys, posts, term_posts, term_views = [], {}, {}, defaultdict(int)
+        for pk, entry in entries:
+            self._add(pk, entry, keys, posts, term_posts, sort=False)
+            for term in entry[1]:
+                term_views[term] += views.get(pk, 0)
+        keys.sort()
+
+        with self._lock:
+            self._keys, self._posts, self._term_posts = keys, posts, term_posts
+            self._views, self._term_views = views, dict(term_views)
+            self._sequence = sequence
+            self._views_time = time.time()
+
+    def _catch_up(self):
+        """按共享的改动记录增量更新，无法增量更新时返回 False"""
+        if self._sequence is None:
+            return False
+
+        sequence = get_sequence()
+        if sequence == self._sequence:
+            return True
+        if not 0 < sequence - self._sequence <= MAX_CHANGES:
+            return False
+
+        changes = get_changes(self._sequence, sequence)
+        if changes is None:
+            return False
+
+        updated, removed = changes
+        posts = list(Post.objects.filter(pk__in=updated).only('id', 'title', 'body', 'views'))
+        # 改动之后又被删除的文章
+        removed = set(removed) | (set(updated) - set(post.pk for post in posts))
+        self._remove_posts(removed)
+        self._update_posts(posts)
+        self._sequence = sequence
+        return True
+
+    def _refresh_views(self):
+        """重新读取阅读量，只调整阅读量变化的文章所含的词"""
+        views = get_views()
+        with self._lock:
+            for pk, (title, terms) in self._posts.items():
+                delta = views.get(pk, 0) - self._views.get(pk, 0)
+                if delta:
+                    for term in terms:
+                        self._term_views[term] += delta
+            self._views = views
+            self._views_time = time.time()
+
+    def _update_posts(self, posts):
+        entries = [(post.pk, self._entry(post), post.views + view_counter.pending(post.pk)) for post in posts]
+        with self._lock:
+            for pk, entry, count in entries:
+                self._remove(pk)
+                self._add(pk, entry, self._keys, self._posts, self._term_posts)
+                self._views[pk] = count
+                for term in entry[1]:
+                    self._term_views[term] = self._term_views.get(term, 0) + count
+
+    def _remove_posts(self, pks):
+        with self._lock:
+            for pk in pks:
+                self._remove(pk)
+
+    def _rerank(self):
+        """重新找出匹配条目超过 MAX_SCAN 个的前缀，排好它们的前 TOP_K 个条目
+        逐层增加前缀的长度，只有上一层超过 MAX_SCAN 个条目的前缀才需要继续细分"""
+        with self._lock:
+            candidates = list(self._keys)
+
+        top, length = {}, 1
+        while candidates:
+            groups = defaultdict(list)
+            for entry in candidates:
+                if len(entry[0]) >= length:
+                    groups[entry[0][:length]].append(entry)
+            candidates = []
+            for prefix, entries in groups.items():
+                if len(entries) > MAX_SCAN:
+                    top[prefix] = heapq.nlargest(TOP_K, entries, key=self._score)
+                    candidates.extend(entries)
+            length += 1
+
+        with self._lock:
+            self._top = top
+
+    def _score(self, entry):
+        key, kind, value, text = entry
+        if kind == self.TITLE:
+            return self._views.get(value, 0)
+        return self._term_views.get(value, 0)
+
+    def _entry(self, post):
+        """文章在前缀索引中的数据：(标题, 标题和正文中的词)"""
+        analyzer = get_analyzer()
+        terms = set(token.text for token in analyzer('%s\n%s' % (post.title, post.body))
+                    if len(token.text) >= MIN_TERM_LENGTH)
+        return post.title, terms
+
+    def _add(self, pk, entry, keys, posts, term_posts, sort=True):
+        title, terms = entry
+        posts[pk] = entry
+        new_keys = [(title.lower(), self.TITLE, pk, title)]
+        for term in terms:
+            term_pks = term_posts.setdefault(term, set())
+            if not term_pks:
+                new_keys.append((term, self.TERM, term, term))
+            term_pks.add(pk)
+
+        for key in new_keys:
+            if sort:
+                insort(keys, key)
+            else:
+                keys.append(key)
+
+    def _remove(self, pk):
+        entry = self._posts.pop(pk, None)
+        if entry is None:
+            return
+
+        title, terms = entry
+        count = self._views.pop(pk, 0)
+        keys = [(title.lower(), self.TITLE, pk, title)]
+        for term in terms:
+            self._term_views[term] = self._term_views.get(term, 0) - count
+            term_pks = self._term_posts.get(term)
+            term_pks.discard(pk)
+            if not term_pks:
+                del self._term_posts[term]
+                self._term_views.pop(term, None)
+                keys.append((term, self.TERM, term, term))
+
+        for key in keys:
+            index = bisect_left(self._keys, key)
+            if index < len(self._keys) and self._keys[index] == key:
+                del self._keys[index]
+
+
+suggestion_index = SuggestionIndex()
+
+
+def on_index_updated(using, model, objects, removed):
+    """index_queue 的监听函数：文章写入搜索索引或从索引删除后，记下改动并更新本进程的前缀索引"""
+    if model is Post and (objects or removed):
+        suggestion_index.apply_changes(objects, removed)
@@ -1,3 +1,311 @@
-from django.test import TestCase
+import datetime
+from unittest import mock
+
+from django.contrib.auth.models import User
+from django.core.cache import cache
+from django.db import connection
+from django.test import TestCase, TransactionTestCase
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+from django.utils import timezone
+from haystack import connections
+from whoosh.fields import Schema, ID
+from whoosh.filedb.filestore import RamStorage
+
+from comments.models import Comment
+from .models import Post, Category, Tag
+from .pagination import PostPaginator, LIST_ORDERING
+from . import suggest
+from .suggest import SuggestionIndex, get_sequence
+from .templatetags.blog_tags import get_recent_posts, archives, get_categories, get_tags
+from .views import IndexView
+from .whoosh_cn_backend import SearcherPool
 
 # Create your tests here.
+
+
+class ListQueryCountTestCase(TestCase):
+    """列表页的查询数不应随每页文章数增长（N+1 查询）"""
+
+    def setUp(self):
+        cache.clear()
+        self.user = User.objects.create_user(username='author')
+        self.category = Category.objects.create(name='分类')
+        self.tag = Tag.objects.create(name='标签')
+
+    def create_posts(self, count):
+        now = timezone.now()
+        for i in range(count):
+            post = Post.objects.create(title='文章 %d' % i, body='正文 %d' % i,
+                                       created_time=now, modified_time=now,
+                                       category=self.category, author=self.user)
+            post.tags.add(self.tag)
+            Comment.objects.create(name='评论者', email='a@example.com', text='评论', post=post)
+
+    def count_queries(self, url):
+        with CaptureQueriesContext(connection) as context:
+            response = self.client.get(url)
+        self.assertEqual(response.status_code, 200)
+        return len(context.captured_queries)
+
+    def assertConstantQueries(self, url, page_sizes=(1, 3, 6)):
+        """依次以不同的每页文章数请求 url，断言每次的查询数相同"""
+        self.create_posts(max(page_sizes))
+        # 先请求一次，让侧边栏等缓存就绪
+        self.client.get(url)
+        counts = []
+        for page_size in page_sizes:
+            with mock.patch.object(IndexView, 'paginate_by', page_size):
+                counts.append(self.count_queries(url))
+        self.assertEqual(len(set(counts)), 1, 'query counts by page size %s: %s' % (page_sizes, counts))
+
+    def assertConstantQueriesByPostCount(self, url_func, post_counts=(1, 5)):
+        """文章数不同时请求同一个列表页，断言查询数相同"""
+        counts = []
+        created = 0
+        for post_count in post_counts:
+            self.create_posts(post_count - created)
+            created = post_count
+            # 侧边栏缓存在事务提交后才失效，测试中不会提交，先请求一次让两次的缓存状态相同
+            self.client.get(url_func())
+            counts.append(self.count_queries(url_func()))
+        self.assertEqual(len(set(counts)), 1, 'query counts by post count %s: %s' % (post_counts, counts))
+
+    def test_index(self):
+        self.assertConstantQueries(reverse('blog:index'))
+
+    def test_archives(self):
+        now = timezone.now()
+        self.assertConstantQueriesByPostCount(
+            lambda: reverse('blog:archives', kwargs={'year': now.year, 'month': now.month}))
+
+    def test_category(self):
+        self.assertConstantQueriesByPostCount(
+            lambda: reverse('blog:category', kwargs={'pk': self.category.pk}))
+
+    def test_tag(self):
+        self.assertConstantQueriesByPostCount(
+            lambda: reverse('blog:tag', kwargs={'pk': self.tag.pk}))
+
+
+class SidebarCacheTestCase(TransactionTestCase):
+    """侧边栏数据缓存后不再查询数据库，文章改变的事务提交后缓存失效"""
+
+    def setUp(self):
+        cache.clear()
+        self.user = User.objects.create_user(username='author')
+        self.category = Category.objects.create(name='分类')
+        self.tag = Tag.objects.create(name='标签')
+
+    def create_post(self, title):
+        now = timezone.now()
+        post = Post.objects.create(title=title, body='正文', created_time=now, modified_time=now,
+                                   category=self.category, author=self.user)
+        post.tags.add(self.tag)
+        return post
+
+    def render_sidebar(self):
+        return (list(get_recent_posts()), list(archives()), list(get_categories()), list(get_tags()))
+
+    def test_steady_state_needs_no_queries(self):
+        self.create_post('文章')
+        self.render_sidebar()
+        with self.assertNumQueries(0):
+            recent_posts, date_list, category_list, tag_list = self.render_sidebar()
+        self.assertEqual([post.title for post in recent_posts], ['文章'])
+        self.assertEqual(category_list[0].post_count, 1)
+        self.assertEqual(tag_list[0].post_count, 1)
+
+    def test_invalidated_on_change(self):
+        post = self.create_post('文章')
+        self.render_sidebar()
+        self.create_post('新文章')
+        self.assertEqual(len(get_recent_posts()), 2)
+        post.tags.clear()
+        self.assertEqual(get_tags()[0].post_count, 1)
+        Post.objects.all().delete()
+        self.assertEqual(self.render_sidebar(), ([], [], [], []))
+
+
+class FeedTestCase(TestCase):
+    """RSS 的 Last-Modified 为 UTC 时间，条件请求返回 304，不同域名分别缓存"""
+
+    def setUp(self):
+        cache.clear()
+        # USE_TZ = False，modified_time 为 Asia/Shanghai 的本地时间
+        modified_time = datetime.datetime(2026, 10, 18, 20, 0)
+        Post.objects.create(title='文章', body='正文', created_time=modified_time, modified_time=modified_time,
+                            category=Category.objects.create(name='分类'),
+                            author=User.objects.create_user(username='author'))
+
+    def test_conditional_get(self):
+        url = reverse('rss')
+        response = self.client.get(url)
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response['Last-Modified'], 'Sun, 18 Oct 2026 12:00:00 GMT')
+
+        response = self.client.get(url, HTTP_IF_MODIFIED_SINCE=response['Last-Modified'])
+        self.assertEqual(response.status_code, 304)
+        response = self.client.get(url, HTTP_IF_MODIFIED_SINCE='Sun, 18 Oct 2026 11:59:59 GMT')
+        self.assertEqual(response.status_code, 200)
+
+    def test_cached_per_host(self):
+        url = reverse('rss')
+        self.assertIn(b'http://a.example.com/', self.client.get(url, HTTP_HOST='a.example.com').content)
+        self.assertIn(b'http://b.example.com/', self.client.get(url, HTTP_HOST='b.example.com').content)
+
+
+class SearchCursorTestCase(TestCase):
+    """搜索结果的下一页链接带游标，游标只用于紧接着它的那一页"""
+
+    def setUp(self):
+        now = timezone.now()
+        category = Category.objects.create(name='分类')
+        user = User.objects.create_user(username='author')
+        for i in range(25):
+            Post.objects.create(title='文章 %d' % i, body='时光 ' * (i + 1), created_time=now, modified_time=now,
+                                category=category, author=user)
+        backend = connections['default'].get_backend()
+        backend.clear()
+        backend.update(connections['default'].get_unified_index().get_index(Post), Post.objects.all())
+
+    def search(self, **params):
+        response = self.client.get(reverse('haystack_search'), dict(q='时光', **params))
+        self.assertEqual(response.status_code, 200)
+        return [result.pk for result in response.context['page'].object_list], response.context['next_cursor']
+
+    def test_cursor_paging(self):
+        page_1, cursor = self.search()
+        self.assertTrue(cursor.startswith('1:'))
+        page_2, next_cursor = self.search(page=2, after=cursor)
+        self.assertEqual((page_2, next_cursor), self.search(page=2))
+        self.assertFalse(set(page_1) & set(page_2))
+
+        # 游标不属于上一页时被忽略，按页码取结果
+        self.assertEqual(self.search(page=3, after=cursor), self.search(page=3))
+
+
+class SuggestionIndexTestCase(TestCase):
+    """输入提示按阅读量排序，其它进程的改动按共享的改动记录增量更新"""
+
+    def setUp(self):
+        cache.clear()
+        now = timezone.now()
+        category = Category.objects.create(name='分类')
+        user = User.objects.create_user(username='author')
+        self.posts = [Post.objects.create(title='Python %d' % i, body='正文', created_time=now, modified_time=now,
+                                          category=category, author=user) for i in range(3)]
+        self.index = SuggestionIndex()
+        self.index.build()
+
+    def titles(self, prefix):
+        return [suggestion['text'] for suggestion in self.index.suggest(prefix) if suggestion['url']]
+
+    def refresh_views(self):
+        self.index._views_time = 0
+        self.index.update()
+
+    def test_ranked_by_views(self):
+        Post.objects.filter(pk=self.posts[1].pk).update(views=10)
+        self.refresh_views()
+        self.assertEqual(self.titles('pyth')[0], 'Python 1')
+        Post.objects.filter(pk=self.posts[2].pk).update(views=20)
+        self.refresh_views()
+        self.assertEqual(self.titles('pyth')[0], 'Python 2')
+
+    def test_ranked_prefixes(self):
+        # 匹配的条目超过 MAX_SCAN 个的前缀使用预先排好的结果
+        Post.objects.filter(pk=self.posts[0].pk).update(views=5)
+        with mock.patch.object(suggest, 'MAX_SCAN', 2):
+            self.refresh_views()
+            self.assertIn('pyth', self.index._top)
+            self.assertEqual(self.titles('pyth')[0], 'Python 0')
+            self.assertEqual(self.titles('python 2'), ['Python 2'])
+
+    def test_incremental_update(self):
+        self.assertEqual(self.index._sequence, get_sequence())
+        # 另一个进程写入了一批改动
+        post = Post.objects.create(title='Pythonic', body='正文', created_time=timezone.now(),
+                                   modified_time=timezone.now(), category=self.posts[0].category,
+                                   author=self.posts[0].author)
+        pk = self.posts[0].pk
+        self.posts[0].delete()
+        SuggestionIndex().apply_changes([post], [pk])
+        self.assertNotEqual(self.index._sequence, get_sequence())
+
+        with mock.patch.object(self.index, '_build', side_effect=AssertionError):
+            self.index.update()
+        self.assertEqual(self.index._sequence, get_sequence())
+        self.assertEqual(sorted(self.titles('pyth')), ['Python 1', 'Python 2', 'Pythonic'])
+
+        # 改动记录缺失时重新建立
+        pk = self.posts[1].pk
+        self.posts[1].delete()
+        SuggestionIndex().apply_changes([], [pk])
+        cache.delete(suggest.CHANGE_KEY % get_sequence())
+        self.index.update()
+        self.assertEqual(sorted(self.titles('pyth')), ['Python 2', 'Pythonic'])
+
+
+class PostPaginatorTestCase(TestCase):
+    """keyset 分页逐页取出的文章和按 LIST_ORDERING 排序的结果一致，文章总数缓存在文章改变后失效"""
+
+    def setUp(self):
+        cache.clear()
+        self.category = Category.objects.create(name='分类')
+        self.user = User.objects.create_user(username='author')
+        now = timezone.now().replace(microsecond=0)
+        # 多篇文章的 created_time 相同，其中两篇的标题也相同，需要依次按 title 和 pk 区分
+        for title, minutes in [('a', 0), ('b', 0), ('b', 0), ('c', 0), ('d', 1), ('e', 2), ('f', 2)]:
+            self.create_post(title, now - datetime.timedelta(minutes=minutes))
+
+    def create_post(self, title, created_time):
+        return Post.objects.create(title=title, body='正文', created_time=created_time, modified_time=created_time,
+                                   category=self.category, author=self.user)
+
+    def paginator(self, **kwargs):
+        return PostPaginator(Post.objects.all(), 3, count_key='test', keyset=True, **kwargs)
+
+    def test_keyset_pages(self):
+        expected = list(Post.objects.order_by(*LIST_ORDERING).values_list('pk', flat=True))
+
+        pages = [[post.pk for post in self.paginator().page(1)]]
+        while len(pages) < 3:
+            pages.append([post.pk for post in self.paginator(after=pages[-1][-1]).page(len(pages) + 1)])
+        self.assertEqual(sum(pages, []), expected)
+
+        # 从最后一页往回翻
+        self.assertEqual([post.pk for post in self.paginator(before=pages[2][0]).page(2)], pages[1])
+        self.assertEqual([post.pk for post in self.paginator(before=pages[1][0]).page(1)], pages[0])
+
+    def test_count_invalidation(self):
+        self.assertEqual(self.paginator().count, 7)
+        with self.assertNumQueries(0):
+            self.assertEqual(self.paginator().count, 7)
+        self.create_post('g', timezone.now())
+        self.assertEqual(self.paginator().count, 8)
+
+
+class SearcherPoolTestCase(TestCase):
+    """另一个进程重建索引后，即使代数（generation）相同，搜索器也要重新打开"""
+
+    def test_recreated_index(self):
+        storage = RamStorage()
+        schema = Schema(id=ID(stored=True, unique=True))
+
+        def create_index(count):
+            ix = storage.create_index(schema)
+            writer = ix.writer()
+            for i in range(count):
+                writer.add_document(id=str(i))
+            writer.commit()
+            return ix
+
+        pool = SearcherPool(create_index(1))
+        with pool.searcher() as pooled:
+            generation = pooled.generation
+        # 同一个存储被重新建立，代数重新从 1 开始
+        create_index(2)
+        with pool.searcher() as pooled:
+            self.assertNotEqual(pooled.generation, generation)
+            self.assertEqual(pooled.searcher.doc_count(), 2)
@@ -16,5 +16,6 @@ urlpatterns = [  # 定义网址和视图函数的关系
     url(r'^archives/(?P<year>[0-9]{4})/(?P<month>[0-9]{1,2})/$', views.ArchivesView.as_view(), name='archives'),
     url(r'^category/(?P<pk>[0-9]+)/$', views.CategoryView.as_view(), name='category'),
     url(r'^tag/(?P<pk>[0-9]+)/$', views.TagView.as_view(), name='tag'),
+    url(r'^suggest/$', views.suggest, name='suggest'),   # 搜索框的输入提示，返回 JSON
 
 ]
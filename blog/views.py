@@ -1,11 +1,15 @@
-import markdown
-from django.db.models import Q
-from django.utils.text import slugify
-from markdown.extensions.toc import TocExtension
+from django.conf import settings
+from django.core.paginator import Paginator, EmptyPage, PageNotAnInteger
 from django.views.generic import ListView, DetailView
+from django.http import Http404, JsonResponse
 from django.shortcuts import render, get_object_or_404
+from haystack.query import SearchQuerySet
+from haystack.views import SearchView
 
+from .archives import month_range
 from .models import Post, Category, Tag
+from .pagination import PostPaginator
+from .suggest import suggestion_index
 from comments.forms import CommentForm
 
 # Create your views here.   ——定义视图函数
@@ -27,13 +31,81 @@ def search(request):
         error_msg = '未输入关键词'
         return render(request, 'blog/index.html', {'error_msg': error_msg})
 
-    '''用户输入了搜索关键词就通过 filter 方法从数据库里过滤出符合条件的所有文章
-    这里的过滤条件是 title__icontains=q，即 title 中包含（contains）关键字 q
-    前缀 i 表示不区分大小写， icontains 是查询表达式（Field lookups）'''
-    # Q 对象用于包装查询表达式，其作用是为了提供复杂的查询逻辑
-    post_list = Post.objects.filter(Q(title__icontains=q) | Q(body__icontains=q))
-    return render(request, 'blog/index.html', {'error_msg': error_msg,
-                                               'post_list': post_list})
+    '''用户输入了搜索关键词就通过 haystack 从全文索引（jieba 分词的 Whoosh 索引，见 search_indexes.py）中检索
+    不再使用 title__icontains/body__icontains 逐行扫描全部文章的正文
+    检索结果按相关度排序并分页，每页文章数与 haystack 搜索页相同'''
+    results = SearchQuerySet().models(Post).auto_query(q)
+    paginator = Paginator(results, getattr(settings, 'HAYSTACK_SEARCH_RESULTS_PER_PAGE', 10))
+    try:
+        page = paginator.page(request.GET.get('page', 1))
+    except PageNotAnInteger:
+        page = paginator.page(1)
+    except EmptyPage:
+        page = paginator.page(paginator.num_pages)
+
+    # 检索结果只含文章的 pk，用一条查询取出本页的文章，并保持相关度的顺序
+    pks = [int(result.pk) for result in page.object_list]
+    posts = Post.objects.for_list().in_bulk(pks)
+    post_list = [posts[pk] for pk in pks if pk in posts]
+
+    is_paginated = paginator.num_pages > 1
+    context = {'error_msg': error_msg,
+               'query': q,
+               'post_list': post_list,
+               'paginator': paginator,
+               'page_obj': page,
+               'is_paginated': is_paginated,
+               }
+    context.update(IndexView().pagination_data(paginator, page, is_paginated))
+    return render(request, 'blog/index.html', context)
+
+
+def suggest(request):
+    """搜索框的输入提示
+    从内存中的前缀索引（见 suggest.py）取出以 q 开头的标题和词，不访问搜索后端
+    前缀索引尚未建立、有新的改动或阅读量已过期时在后台更新，不阻塞当前请求"""
+    q = request.GET.get('q', '')
+    suggestion_index.refresh()
+    return JsonResponse({'query': q, 'suggestions': suggestion_index.suggest(q)})
+
+
+class PostSearchView(SearchView):
+    """haystack 的搜索页（haystack_search）
+    下一页的链接带上本页的页码和最后一条结果的游标 after（见 whoosh_cn_backend.ResultWindow）
+    后端从游标之后继续收集结果，只需要保留一页的结果，翻到很深的页和第一页的耗时相近
+    游标只用于紧接着它的那一页，其他页码或游标失效（例如索引已更新）时后端按页码的偏移量取结果"""
+
+    def get_results(self):
+        results = super(PostSearchView, self).get_results()
+        search_after = self.get_search_after()
+        if search_after:
+            results = results._clone()
+            results.query.set_search_after(search_after)
+        return results
+
+    def get_search_after(self):
+        """after 的格式为 '页码:游标'，页码不是当前页的上一页时忽略游标"""
+        cursor_page, _, search_after = self.request.GET.get('after', '').partition(':')
+        try:
+            page = int(self.request.GET.get('page', 1))
+        except ValueError:
+            return None
+        if cursor_page != str(page - 1):
+            return None
+        return search_after or None
+
+    def build_page(self):
+        self.paginator, self.page = super(PostSearchView, self).build_page()
+        return self.paginator, self.page
+
+    def extra_context(self):
+        next_cursor = None
+        object_list = list(self.page.object_list)
+        if self.page.has_next() and object_list:
+            search_after = getattr(object_list[-1], 'search_after', None)
+            if search_after:
+                next_cursor = '%d:%s' % (self.page.number, search_after)
+        return {'next_cursor': next_cursor}
 
 
 class IndexView(ListView):
@@ -44,14 +116,31 @@ class IndexView(ListView):
         model：指定要获取的模型是 Post
         context_object_name：指定获取的模型列表数据保存的变量名，这个变量会被传递给模板
         template_name：指定要用这个视图渲染的模板
+        queryset：列表页共用的查询集，一次取出分类、作者和评论数
     """
     model = Post
+    queryset = Post.objects.for_list()
     context_object_name = 'post_list'
     template_name = 'blog/index.html'
 
     # 指定 paginate_by 属性以开启分页功能，其值为每页文章数
     paginate_by = 3
 
+    # 文章总数的缓存键，见 pagination.PostPaginator
+    count_key = 'index'
+
+    def get_paginator(self, queryset, per_page, orphans=0, allow_empty_first_page=True, **kwargs):
+        """使用缓存总数的 PostPaginator
+        POST_LIST_PAGINATION 为 'keyset' 时，上一页/下一页按链接中的 before/after 游标取出"""
+        return PostPaginator(queryset, per_page, orphans=orphans, allow_empty_first_page=allow_empty_first_page,
+                             count_key=self.get_count_key(),
+                             keyset=getattr(settings, 'POST_LIST_PAGINATION', 'offset') == 'keyset',
+                             after=self.request.GET.get('after'), before=self.request.GET.get('before'),
+                             **kwargs)
+
+    def get_count_key(self):
+        return self.count_key
+
     def get_context_data(self, **kwargs):
         """函数 render 的 context 参数将视图函数中的模板变量作为一个字典传递给模板
         例如 render(request, 'blog/index.html', context={'post_list': post_list})
@@ -79,6 +168,14 @@ class IndexView(ListView):
         pagination_data 方法返回的也是一个字典'''
         context.update(pagination_data)
 
+        # keyset 分页时，相邻两页的链接带上本页第一篇/最后一篇文章的 pk 作为游标
+        if is_paginated and paginator.keyset:
+            post_list = list(page.object_list)
+            if page.has_previous():
+                context['previous_cursor'] = post_list[0].pk
+            if page.has_next():
+                context['next_cursor'] = post_list[-1].pk
+
         '''将更新后的 context 返回，以便 ListView 使用这个字典中的模板变量渲染模板
         此时 context 字典中已有了显示分页导航条所需的数据'''
         return context
@@ -198,27 +295,21 @@ class PostDetailView(DetailView):
         return response
 
     def get_object(self, queryset=None):
-        """对 post 的 body 值进行渲染"""
+        """获取 post，正文 HTML 和目录已在 Post.save 时渲染好并存入 body_html 和 toc
+        尚未回填（见 render_posts 命令）的旧文章在这里临时渲染一次"""
         post = super(PostDetailView, self).get_object(queryset=None)
-        # 对md语法的拓展
-        md = markdown.Markdown(extensions=[
-            'markdown.extensions.extra',  # 多种拓展
-            'markdown.extensions.codehilite',  # 语法高亮拓展
-            # 'markdown.extensions.toc',  # 自动生成目录拓展
-            TocExtension(slugify=slugify)
-        ])
-        post.body = md.convert(post.body)
-        post.toc = md.toc
+        if not post.body_html:
+            post.render_body()
         return post
 
     def get_context_data(self, **kwargs):
-        """将 post、评论表单、post 下的评论列表传递给模板"""
+        """将 post 和评论表单传递给模板
+        第一页评论在模板的缓存片段中用 get_comment_page 标签取出，片段有缓存时不会查询评论
+        其余评论由“加载更多”按需请求（见 comments/pagination.py）"""
         context = super(PostDetailView, self).get_context_data(**kwargs)
         form = CommentForm()
-        comment_list = self.object.comment_set.all()
         context.update({
             'form': form,
-            'comment_list': comment_list
         })
         return context
 
@@ -226,22 +317,26 @@ class PostDetailView(DetailView):
 class ArchivesView(ListView):
     """归档的类视图"""
     model = Post
+    queryset = Post.objects.for_list()
     template_name = 'blog/index.html'
     context_object_name = 'post_list'
 
     def get_queryset(self):
-        year = self.kwargs.get('year')
-        month = self.kwargs.get('month')
-        return super(ArchivesView, self).get_queryset().filter(created_time__year=year,
-                                                               created_time__month=month
+        """按 [本月第一天, 下月第一天) 的半开区间筛选，可以使用 created_time 的索引"""
+        try:
+            start, end = month_range(int(self.kwargs.get('year')), int(self.kwargs.get('month')))
+        except ValueError:
+            raise Http404('日期不正确')
+        return super(ArchivesView, self).get_queryset().filter(created_time__gte=start,
+                                                               created_time__lt=end
                                                                )
 
 
-class CategoryView(ListView):
-    """分类的类视图，因为属性和类 IndexView 一样，所以直接继承 IndexView """
-    model = Post
-    context_object_name = 'post_list'
-    template_name = 'blog/index.html'
+class CategoryView(IndexView):
+    """分类的类视图，因为属性和类 IndexView 一样，所以直接继承 IndexView，分页方式也相同"""
+
+    def get_count_key(self):
+        return 'category:%s' % self.kwargs.get('pk')
 
     def get_queryset(self):
         """获取指定分类下的文章列表数据：
@@ -250,11 +345,11 @@ class CategoryView(ListView):
         return super(CategoryView, self).get_queryset().filter(category=cate)
 
 
-class TagView(ListView):
-    """标签的类视图"""
-    model = Post
-    context_object_name = 'post_list'
-    template_name = 'blog/index.html'
+class TagView(IndexView):
+    """标签的类视图，同样继承 IndexView"""
+
+    def get_count_key(self):
+        return 'tag:%s' % self.kwargs.get('pk')
 
     def get_queryset(self):
         """获取指定标签下的文章列表数据"""
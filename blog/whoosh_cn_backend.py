@@ -2,12 +2,16 @@
 
 from __future__ import absolute_import, division, print_function, unicode_literals
 
+import copy
+import hashlib
 import json
 import os
 import re
 import shutil
 import threading
 import warnings
+from contextlib import contextmanager
+from multiprocessing import cpu_count
 
 from django.conf import settings
 from django.core.exceptions import ImproperlyConfigured
@@ -16,7 +20,7 @@ from django.utils.datetime_safe import datetime
 from django.utils.encoding import force_text
 
 from haystack.backends import BaseEngine, BaseSearchBackend, BaseSearchQuery, EmptyResults, log_query
-from haystack.constants import DJANGO_CT, DJANGO_ID, ID
+from haystack.constants import DEFAULT_ALIAS, DJANGO_CT, DJANGO_ID, ID
 from haystack.exceptions import MissingDependency, SearchBackendError, SkipDocument
 from haystack.inputs import Clean, Exact, PythonData, Raw
 from haystack.models import SearchResult
@@ -24,7 +28,8 @@ from haystack.utils import log as logging
 from haystack.utils import get_identifier, get_model_ct
 from haystack.utils.app_loading import haystack_get_model
 
-from jieba.analyse import ChineseAnalyzer
+from .analyzer import get_analyzer
+from .utils import LRUCache
 
 try:
     import whoosh
@@ -37,12 +42,13 @@ if not hasattr(whoosh, '__version__') or whoosh.__version__ < (2, 5, 0):
 
 # Bubble up the correct error.
 from whoosh import index
-from whoosh.analysis import StemmingAnalyzer
+from whoosh.collectors import FilterCollector, TopCollector
 from whoosh.fields import ID as WHOOSH_ID
 from whoosh.fields import BOOLEAN, DATETIME, IDLIST, KEYWORD, NGRAM, NGRAMWORDS, NUMERIC, Schema, TEXT
 from whoosh.filedb.filestore import FileStorage, RamStorage
 from whoosh.highlight import highlight as whoosh_highlight
 from whoosh.highlight import ContextFragmenter, HtmlFormatter
+from whoosh.idsets import BitSet
 from whoosh.qparser import QueryParser
 from whoosh.searching import ResultsPage
 from whoosh.writing import AsyncWriter
@@ -62,6 +68,234 @@ class WhooshHtmlFormatter(HtmlFormatter):
     template = '<%(tag)s>%(t)s</%(tag)s>'
 
 
+def split_multivalued(value):
+    """
+    Decodes a stored KEYWORD value into a list.
+    """
+    if not value:
+        return []
+
+    return value.split(',')
+
+
+class SearchAfterCollector(TopCollector):
+    """
+    Collects the top ``limit`` hits ranked strictly after a cursor.
+
+    Hits are ranked by descending score, ties by ascending document number,
+    exactly as ``TopCollector`` orders them. ``after`` is the
+    ``(score, docnum)`` of the last hit of the previous page, so the next
+    page only keeps a heap of ``limit`` hits however deep it is.
+    """
+    def __init__(self, after, limit=10, **kwargs):
+        super(SearchAfterCollector, self).__init__(limit=limit, **kwargs)
+        self.after_score, self.after_docnum = after
+
+    def _collect(self, global_docnum, score):
+        if score > self.after_score or (score == self.after_score and global_docnum <= self.after_docnum):
+            self.total += 1
+            return 0
+
+        return super(SearchAfterCollector, self)._collect(global_docnum, score)
+
+
+class ResultWindow(object):
+    """
+    The hits of one requested window, with the total hit count.
+
+    Stands in for ``ResultsPage`` in ``_process_results``. When the window
+    is ranked by relevance, ``generation`` is set and every hit carries a
+    ``search_after`` cursor pointing just past it.
+    """
+    def __init__(self, hits, total, generation=None):
+        self.hits = hits
+        self.total = total
+        self.generation = generation
+
+    def __len__(self):
+        return self.total
+
+    def __iter__(self):
+        return iter(self.hits)
+
+    def score(self, n):
+        return self.hits[n].score
+
+    def cursor(self, n):
+        hit = self.hits[n]
+        return '%s_%r_%d' % (self.generation, hit.score, hit.docnum)
+
+
+def parse_cursor(cursor, generation):
+    """
+    Returns the ``(score, docnum)`` of a ``search_after`` cursor, or ``None``
+    if it is malformed or was issued for another index generation (document
+    numbers change when segments merge).
+    """
+    try:
+        cursor_generation, score, docnum = cursor.split('_')
+        if cursor_generation != generation:
+            return None
+        return float(score), int(docnum)
+    except (AttributeError, ValueError):
+        return None
+
+
+def index_generation(ix):
+    """
+    Returns a token identifying the latest commit of ``ix``.
+
+    The TOC generation number alone is not enough: recreating the index
+    (``rebuild_index``, ``bulk_rebuild_index``) starts counting again, so a
+    reused number could hide a completely different index. Segment ids are
+    random per segment, so they are folded into the token as well.
+    """
+    toc = ix._read_toc()
+    segment_ids = ','.join(segment.segment_id() for segment in toc.segments)
+    return '%d.%s' % (toc.generation, hashlib.md5(segment_ids.encode('utf-8')).hexdigest()[:12])
+
+
+class PooledSearcher(object):
+    """
+    A searcher shared by every query against one generation of the index.
+
+    ``refs`` counts the pool's own reference plus one per query currently
+    using it; the underlying reader is closed once it drops to zero.
+    ``cache`` holds per-generation data derived from this searcher.
+    """
+    def __init__(self, searcher, generation):
+        self.searcher = searcher
+        self.generation = generation
+        self.refs = 1
+        self.cache = {}
+
+
+class SearcherPool(object):
+    """
+    Hands out one long-lived searcher per index generation.
+
+    When a writer commits a new generation, the next ``acquire`` opens a
+    searcher on it and swaps it in atomically. The previous searcher stays
+    open until the last query holding it releases it. Generations are the
+    per-commit tokens returned by ``index_generation``.
+    """
+    def __init__(self, index):
+        self.index = index
+        self.lock = threading.Lock()
+        self.current = None
+
+    def acquire(self):
+        # The token is read before the searcher is opened: if a commit lands
+        # in between, the next acquire sees a new token and reopens.
+        generation = index_generation(self.index)
+
+        with self.lock:
+            if self.current is None or self.current.generation != generation:
+                retired = self.current
+                self.current = PooledSearcher(self.index.searcher(), generation)
+
+                if retired is not None:
+                    self._release(retired)
+
+            self.current.refs += 1
+            return self.current
+
+    def release(self, pooled):
+        with self.lock:
+            self._release(pooled)
+
+    def _release(self, pooled):
+        pooled.refs -= 1
+
+        if pooled.refs <= 0:
+            pooled.searcher.close()
+
+    @contextmanager
+    def searcher(self):
+        pooled = self.acquire()
+
+        try:
+            yield pooled
+        finally:
+            self.release(pooled)
+
+    def close(self):
+        with self.lock:
+            if self.current is not None:
+                self._release(self.current)
+                self.current = None
+
+
+class ResultCache(object):
+    """
+    Caches processed search results per index generation.
+
+    Every key starts with the generation of the searcher that produced the
+    results, so a commit from ``update``/``remove``/``clear`` makes older
+    entries unreachable; they simply age out of the LRU. Cached
+    ``SearchResult`` objects are copied on the way out, so objects loaded
+    through ``result.object`` never leak between requests.
+    """
+    def __init__(self, max_entries=256, log_interval=1000):
+        self.entries = LRUCache(max_entries)
+        self.log_interval = log_interval
+        self.lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        self.log = logging.getLogger('haystack')
+
+    def get(self, key):
+        results = self.entries.get(key)
+        self._record(results is not None)
+
+        if results is None:
+            return None
+
+        return self._copy(results)
+
+    def set(self, key, results):
+        self.entries.set(key, results)
+        return self._copy(results)
+
+    def clear(self):
+        self.entries.clear()
+
+    def stats(self):
+        with self.lock:
+            lookups = self.hits + self.misses
+            return {
+                'hits': self.hits,
+                'misses': self.misses,
+                'hit_rate': self.hits / lookups if lookups else 0.0,
+                'entries': len(self.entries),
+            }
+
+    def _record(self, hit):
+        with self.lock:
+            if hit:
+                self.hits += 1
+            else:
+                self.misses += 1
+
+            report = self.log_interval and (self.hits + self.misses) % self.log_interval == 0
+
+        if report:
+            stats = self.stats()
+            self.log.info("Search result cache: %d hits, %d misses, hit rate %.1f%%, %d entries",
+                          stats['hits'], stats['misses'], stats['hit_rate'] * 100, stats['entries'])
+
+    def _copy(self, results):
+        copied = dict(results)
+        copied['results'] = []
+
+        for result in results['results']:
+            result = copy.copy(result)
+            result._object = None
+            copied['results'].append(result)
+
+        return copied
+
+
 class WhooshSearchBackend(BaseSearchBackend):
     # Word reserved by Whoosh for special use.
     RESERVED_WORDS = (
@@ -81,6 +315,8 @@ class WhooshSearchBackend(BaseSearchBackend):
     def __init__(self, connection_alias, **connection_options):
         super(WhooshSearchBackend, self).__init__(connection_alias, **connection_options)
         self.setup_complete = False
+        self.searcher_pool = None
+        self._decoders = {}
         self.use_file_storage = True
         self.post_limit = getattr(connection_options, 'POST_LIMIT', 128 * 1024 * 1024)
         self.path = connection_options.get('PATH')
@@ -91,6 +327,11 @@ class WhooshSearchBackend(BaseSearchBackend):
         if self.use_file_storage and not self.path:
             raise ImproperlyConfigured("You must specify a 'PATH' in your settings for connection '%s'." % connection_alias)
 
+        self.highlight_cache = LRUCache(connection_options.get('HIGHLIGHT_CACHE_SIZE', 1024))
+        self.result_cache = ResultCache(connection_options.get('RESULT_CACHE_SIZE', 256))
+        # 'exact' counts every matching document, 'estimated' reads the
+        # count off the term statistics without a second matching pass.
+        self.hit_count = connection_options.get('HIT_COUNT', 'exact')
         self.log = logging.getLogger('haystack')
 
     def setup(self):
@@ -129,6 +370,13 @@ class WhooshSearchBackend(BaseSearchBackend):
             except index.EmptyIndexError:
                 self.index = self.storage.create_index(self.schema)
 
+        if self.searcher_pool is not None:
+            self.searcher_pool.close()
+
+        self.searcher_pool = SearcherPool(self.index)
+        # A recreated index starts counting generations again.
+        self.result_cache.clear()
+        self._decoders = {}
         self.setup_complete = True
 
     def build_schema(self, fields):
@@ -162,7 +410,7 @@ class WhooshSearchBackend(BaseSearchBackend):
             elif field_class.field_type == 'edge_ngram':
                 schema_fields[field_class.index_fieldname] = NGRAMWORDS(minsize=2, maxsize=15, at='start', stored=field_class.stored, field_boost=field_class.boost)
             else:
-                schema_fields[field_class.index_fieldname] = TEXT(stored=True, analyzer=ChineseAnalyzer(), field_boost=field_class.boost, sortable=True)
+                schema_fields[field_class.index_fieldname] = TEXT(stored=True, analyzer=get_analyzer(), field_boost=field_class.boost, sortable=True)
 
             if field_class.document is True:
                 content_field_name = field_class.index_fieldname
@@ -183,37 +431,94 @@ class WhooshSearchBackend(BaseSearchBackend):
         writer = AsyncWriter(self.index)
 
         for obj in iterable:
-            try:
-                doc = index.full_prepare(obj)
-            except SkipDocument:
-                self.log.debug(u"Indexing for object `%s` skipped", obj)
-            else:
-                # Really make sure it's unicode, because Whoosh won't have it any
-                # other way.
-                for key in doc:
-                    doc[key] = self._from_python(doc[key])
+            doc = self._prepare_document(index, obj)
 
-                # Document boosts aren't supported in Whoosh 2.5.0+.
-                if 'boost' in doc:
-                    del doc['boost']
-
-                try:
-                    writer.update_document(**doc)
-                except Exception as e:
-                    if not self.silently_fail:
-                        raise
-
-                    # We'll log the object identifier but won't include the actual object
-                    # to avoid the possibility of that generating encoding errors while
-                    # processing the log message:
-                    self.log.error(u"%s while preparing object for update" % e.__class__.__name__,
-                                   exc_info=True, extra={"data": {"index": index,
-                                                                  "object": get_identifier(obj)}})
+            if doc is not None:
+                self._write_document(writer.update_document, index, obj, doc)
 
         if len(iterable) > 0:
             # For now, commit no matter what, as we run into locking issues otherwise.
             writer.commit()
 
+    def bulk_update(self, index, iterable, procs=None, batchsize=100, multisegment=True, limitmb=128):
+        """
+        Adds a large stream of objects to the index with a single writer.
+
+        Intended for rebuilding an empty index: documents are added rather
+        than updated, so existing copies are not looked up and deleted.
+        With ``procs > 1`` Whoosh's ``MpWriter`` hands batches of prepared
+        documents to worker processes, which run the jieba analyzer in
+        parallel; with ``multisegment`` their segments are added as-is
+        instead of being merged at commit. Multiprocess writing needs file
+        storage, so RAM indexes always use one process.
+
+        Returns the number of documents written.
+        """
+        if not self.setup_complete:
+            self.setup()
+
+        if not self.use_file_storage:
+            procs = 1
+
+        if procs is None:
+            procs = cpu_count()
+
+        if procs > 1:
+            writer = self.index.writer(procs=procs, batchsize=batchsize,
+                                       multisegment=multisegment, limitmb=limitmb)
+        else:
+            writer = self.index.writer(limitmb=limitmb)
+
+        written = 0
+
+        try:
+            for obj in iterable:
+                doc = self._prepare_document(index, obj)
+
+                if doc is not None and self._write_document(writer.add_document, index, obj, doc):
+                    written += 1
+        except:
+            writer.cancel()
+            raise
+
+        writer.commit()
+        return written
+
+    def _prepare_document(self, index, obj):
+        try:
+            doc = index.full_prepare(obj)
+        except SkipDocument:
+            self.log.debug(u"Indexing for object `%s` skipped", obj)
+            return None
+
+        # Really make sure it's unicode, because Whoosh won't have it any
+        # other way.
+        for key in doc:
+            doc[key] = self._from_python(doc[key])
+
+        # Document boosts aren't supported in Whoosh 2.5.0+.
+        if 'boost' in doc:
+            del doc['boost']
+
+        return doc
+
+    def _write_document(self, write, index, obj, doc):
+        try:
+            write(**doc)
+        except Exception as e:
+            if not self.silently_fail:
+                raise
+
+            # We'll log the object identifier but won't include the actual object
+            # to avoid the possibility of that generating encoding errors while
+            # processing the log message:
+            self.log.error(u"%s while preparing object for update" % e.__class__.__name__,
+                           exc_info=True, extra={"data": {"index": index,
+                                                          "object": get_identifier(obj)}})
+            return False
+
+        return True
+
     def remove(self, obj_or_string, commit=True):
         if not self.setup_complete:
             self.setup()
@@ -276,6 +581,66 @@ class WhooshSearchBackend(BaseSearchBackend):
         self.index = self.index.refresh()
         self.index.optimize()
 
+    def calculate_window(self, start_offset=0, end_offset=None):
+        """
+        Normalizes a requested window to ``(start_offset, end_offset)``.
+
+        ``end_offset`` stays ``None`` when the caller wants every hit.
+        """
+        if start_offset is None:
+            start_offset = 0
+
+        # Prevent against Whoosh throwing an error. Requires a limit greater
+        # than 0.
+        if end_offset is not None and end_offset <= start_offset:
+            end_offset = start_offset + 1
+
+        return start_offset, end_offset
+
+    def _search_window(self, searcher, parsed_query, start_offset, end_offset, search_kwargs, hit_count, generation):
+        """
+        Collects only the top ``end_offset`` hits and slices out the window.
+
+        Unlike ``search_page``, a window past the last hit costs no more than
+        scoring the query once; it simply comes back empty.
+        """
+        start_offset, end_offset = self.calculate_window(start_offset, end_offset)
+        raw_results = searcher.search(parsed_query, limit=end_offset, **search_kwargs)
+        hits = raw_results[start_offset:end_offset]
+        total = self._count_hits(raw_results, hit_count, start_offset + len(hits) if hits else 0)
+        return ResultWindow(hits, total, generation)
+
+    def _search_after(self, searcher, parsed_query, after, start_offset, end_offset, narrowed_results, hit_count, generation):
+        """
+        Collects the page that follows a ``search_after`` cursor.
+
+        Only the page length is kept in the heap, so page 500 costs about
+        the same as page 1. ``start_offset`` only sizes the page.
+        """
+        start_offset, end_offset = self.calculate_window(start_offset, end_offset)
+        collector = SearchAfterCollector(after, limit=(end_offset or 1000000) - start_offset)
+
+        if narrowed_results is not None:
+            collector = FilterCollector(collector, allow=narrowed_results)
+
+        searcher.search_with_collector(parsed_query, collector)
+        raw_results = collector.results()
+        hits = raw_results[:]
+        total = self._count_hits(raw_results, hit_count, start_offset + len(hits) if hits else 0)
+        return ResultWindow(hits, total, generation)
+
+    def _count_hits(self, raw_results, hit_count, minimum):
+        """
+        Returns the total hit count in the requested mode, never less than
+        the hits already collected.
+        """
+        if (hit_count or self.hit_count) == 'estimated':
+            total = raw_results.estimated_length()
+        else:
+            total = len(raw_results)
+
+        return max(total, minimum)
+
     def calculate_page(self, start_offset=0, end_offset=None):
         # Prevent against Whoosh throwing an error. Requires an end_offset
         # greater than 0.
@@ -305,7 +670,8 @@ class WhooshSearchBackend(BaseSearchBackend):
                fields='', highlight=False, facets=None, date_facets=None, query_facets=None,
                narrow_queries=None, spelling_query=None, within=None,
                dwithin=None, distance_point=None, models=None,
-               limit_to_registered_models=None, result_class=None, **kwargs):
+               limit_to_registered_models=None, result_class=None,
+               search_after=None, hit_count=None, **kwargs):
         if not self.setup_complete:
             self.setup()
 
@@ -367,7 +733,6 @@ class WhooshSearchBackend(BaseSearchBackend):
             warnings.warn("Whoosh does not handle query faceting.", Warning, stacklevel=2)
 
         narrowed_results = None
-        self.index = self.index.refresh()
 
         if limit_to_registered_models is None:
             limit_to_registered_models = getattr(settings, 'HAYSTACK_LIMIT_TO_REGISTERED_MODELS', True)
@@ -387,99 +752,101 @@ class WhooshSearchBackend(BaseSearchBackend):
 
             narrow_queries.add(' OR '.join(['%s:%s' % (DJANGO_CT, rm) for rm in model_choices]))
 
-        narrow_searcher = None
-
-        if narrow_queries is not None:
-            # Potentially expensive? I don't see another way to do it in Whoosh...
-            narrow_searcher = self.index.searcher()
-
-            for nq in narrow_queries:
-                recent_narrowed_results = narrow_searcher.search(self.parser.parse(force_text(nq)),
-                                                                 limit=None)
-
-                if len(recent_narrowed_results) <= 0:
+        # Narrowing and the main query share the pooled searcher for the
+        # current index generation; it is released on every return path.
+        with self.searcher_pool.searcher() as pooled:
+            searcher = pooled.searcher
+
+            # Popular queries are answered from the result cache without
+            # parsing, scoring or processing hits again.
+            cache_key = (
+                pooled.generation,
+                ' '.join(query_string.split()),
+                sort_by,
+                reverse,
+                start_offset,
+                end_offset,
+                tuple(sorted(narrow_queries or ())),
+                highlight,
+                spelling_query,
+                result_class,
+                search_after,
+                hit_count,
+            )
+            cached = self.result_cache.get(cache_key)
+
+            if cached is not None:
+                return cached
+
+            if narrow_queries is not None:
+                narrowed_results = self._narrow_filter(pooled, narrow_queries)
+
+                if narrowed_results is not None and len(narrowed_results) <= 0:
                     return {
                         'results': [],
                         'hits': 0,
                     }
 
-                if narrowed_results:
-                    narrowed_results.filter(recent_narrowed_results)
-                else:
-                   narrowed_results = recent_narrowed_results
-
-        self.index = self.index.refresh()
+            if searcher.doc_count():
+                parsed_query = self.parser.parse(query_string)
 
-        if self.index.doc_count():
-            searcher = self.index.searcher()
-            parsed_query = self.parser.parse(query_string)
+                # In the event of an invalid/stopworded query, recover gracefully.
+                if parsed_query is None:
+                    return {
+                        'results': [],
+                        'hits': 0,
+                    }
 
-            # In the event of an invalid/stopworded query, recover gracefully.
-            if parsed_query is None:
-                return {
-                    'results': [],
-                    'hits': 0,
+                search_kwargs = {
+                    'sortedby': sort_by,
+                    'reverse': reverse,
                 }
 
-            page_num, page_length = self.calculate_page(start_offset, end_offset)
+                # Handle the case where the results have been narrowed.
+                if narrowed_results is not None:
+                    search_kwargs['filter'] = narrowed_results
 
-            search_kwargs = {
-                'pagelen': page_length,
-                'sortedby': sort_by,
-                'reverse': reverse,
-            }
+                after = None
 
-            # Handle the case where the results have been narrowed.
-            if narrowed_results is not None:
-                search_kwargs['filter'] = narrowed_results
+                # Cursors only make sense for the relevance ranking.
+                if search_after and sort_by is None:
+                    after = parse_cursor(search_after, pooled.generation)
 
-            try:
-                raw_page = searcher.search_page(
-                    parsed_query,
-                    page_num,
-                    **search_kwargs
-                )
-            except ValueError:
-                if not self.silently_fail:
-                    raise
+                try:
+                    if after is not None:
+                        raw_page = self._search_after(searcher, parsed_query, after, start_offset, end_offset,
+                                                      narrowed_results, hit_count, pooled.generation)
+                    else:
+                        raw_page = self._search_window(searcher, parsed_query, start_offset, end_offset,
+                                                       search_kwargs, hit_count,
+                                                       pooled.generation if sort_by is None else None)
+                except ValueError:
+                    if not self.silently_fail:
+                        raise
 
-                return {
-                    'results': [],
-                    'hits': 0,
-                    'spelling_suggestion': None,
-                }
+                    return {
+                        'results': [],
+                        'hits': 0,
+                        'spelling_suggestion': None,
+                    }
+
+                results = self._process_results(raw_page, highlight=highlight, query_string=query_string, spelling_query=spelling_query, result_class=result_class)
+                return self.result_cache.set(cache_key, results)
+            else:
+                if self.include_spelling:
+                    if spelling_query:
+                        spelling_suggestion = self.create_spelling_suggestion(spelling_query)
+                    else:
+                        spelling_suggestion = self.create_spelling_suggestion(query_string)
+                else:
+                    spelling_suggestion = None
 
-            # Because as of Whoosh 2.5.1, it will return the wrong page of
-            # results if you request something too high. :(
-            if raw_page.pagenum < page_num:
                 return {
                     'results': [],
                     'hits': 0,
-                    'spelling_suggestion': None,
+                    'spelling_suggestion': spelling_suggestion,
                 }
 
-            results = self._process_results(raw_page, highlight=highlight, query_string=query_string, spelling_query=spelling_query, result_class=result_class)
-            searcher.close()
-
-            if hasattr(narrow_searcher, 'close'):
-                narrow_searcher.close()
-
-            return results
-        else:
-            if self.include_spelling:
-                if spelling_query:
-                    spelling_suggestion = self.create_spelling_suggestion(spelling_query)
-                else:
-                    spelling_suggestion = self.create_spelling_suggestion(query_string)
-            else:
-                spelling_suggestion = None
-
-            return {
-                'results': [],
-                'hits': 0,
-                'spelling_suggestion': spelling_suggestion,
-            }
-
     def more_like_this(self, model_instance, additional_query_string=None,
                        start_offset=0, end_offset=None, models=None,
                        limit_to_registered_models=None, result_class=None, **kwargs):
@@ -493,7 +860,6 @@ class WhooshSearchBackend(BaseSearchBackend):
         field_name = self.content_field_name
         narrow_queries = set()
         narrowed_results = None
-        self.index = self.index.refresh()
 
         if limit_to_registered_models is None:
             limit_to_registered_models = getattr(settings, 'HAYSTACK_LIMIT_TO_REGISTERED_MODELS', True)
@@ -516,76 +882,89 @@ class WhooshSearchBackend(BaseSearchBackend):
         if additional_query_string and additional_query_string != '*':
             narrow_queries.add(additional_query_string)
 
-        narrow_searcher = None
+        page_num, page_length = self.calculate_page(start_offset, end_offset)
 
-        if narrow_queries is not None:
-            # Potentially expensive? I don't see another way to do it in Whoosh...
-            narrow_searcher = self.index.searcher()
+        with self.searcher_pool.searcher() as pooled:
+            searcher = pooled.searcher
 
-            for nq in narrow_queries:
-                recent_narrowed_results = narrow_searcher.search(self.parser.parse(force_text(nq)),
-                                                                 limit=None)
+            if narrow_queries is not None:
+                narrowed_results = self._narrow_filter(pooled, narrow_queries)
 
-                if len(recent_narrowed_results) <= 0:
+                if narrowed_results is not None and len(narrowed_results) <= 0:
                     return {
                         'results': [],
                         'hits': 0,
                     }
 
-                if narrowed_results:
-                    narrowed_results.filter(recent_narrowed_results)
-                else:
-                   narrowed_results = recent_narrowed_results
+            raw_results = EmptyResults()
 
-        page_num, page_length = self.calculate_page(start_offset, end_offset)
+            if searcher.doc_count():
+                query = "%s:%s" % (ID, get_identifier(model_instance))
+                parsed_query = self.parser.parse(query)
+                results = searcher.search(parsed_query)
 
-        self.index = self.index.refresh()
-        raw_results = EmptyResults()
+                # Handle the case where the results have been narrowed.
+                if len(results):
+                    raw_results = results[0].more_like_this(field_name, top=end_offset,
+                                                            filter=narrowed_results)
 
-        if self.index.doc_count():
-            query = "%s:%s" % (ID, get_identifier(model_instance))
-            searcher = self.index.searcher()
-            parsed_query = self.parser.parse(query)
-            results = searcher.search(parsed_query)
+            try:
+                raw_page = ResultsPage(raw_results, page_num, page_length)
+            except ValueError:
+                if not self.silently_fail:
+                    raise
 
-            if len(results):
-                raw_results = results[0].more_like_this(field_name, top=end_offset)
+                return {
+                    'results': [],
+                    'hits': 0,
+                    'spelling_suggestion': None,
+                }
 
-            # Handle the case where the results have been narrowed.
-            if narrowed_results is not None and hasattr(raw_results, 'filter'):
-                raw_results.filter(narrowed_results)
+            # Because as of Whoosh 2.5.1, it will return the wrong page of
+            # results if you request something too high. :(
+            if raw_page.pagenum < page_num:
+                return {
+                    'results': [],
+                    'hits': 0,
+                    'spelling_suggestion': None,
+                }
 
-        try:
-            raw_page = ResultsPage(raw_results, page_num, page_length)
-        except ValueError:
-            if not self.silently_fail:
-                raise
+            return self._process_results(raw_page, result_class=result_class)
 
-            return {
-                'results': [],
-                'hits': 0,
-                'spelling_suggestion': None,
-            }
+    def _narrow_filter(self, pooled, narrow_queries):
+        """
+        Turns ``narrow_queries`` into a filter for ``Searcher.search``.
 
-        # Because as of Whoosh 2.5.1, it will return the wrong page of
-        # results if you request something too high. :(
-        if raw_page.pagenum < page_num:
-            return {
-                'results': [],
-                'hits': 0,
-                'spelling_suggestion': None,
-            }
+        Each narrow query is resolved to a ``BitSet`` of document numbers
+        once per index generation and cached on the pooled searcher, instead
+        of materializing every matching document on each call. Returns
+        ``None`` when every live document matches (no filtering needed), or
+        an empty set when nothing can match.
+        """
+        searcher = pooled.searcher
+        narrowed = None
 
-        results = self._process_results(raw_page, result_class=result_class)
-        searcher.close()
+        for nq in narrow_queries:
+            nq = force_text(nq)
+            cache_key = ('narrow', nq)
+            docs = pooled.cache.get(cache_key)
 
-        if hasattr(narrow_searcher, 'close'):
-            narrow_searcher.close()
+            if docs is None:
+                docs = BitSet(searcher.docs_for_query(self.parser.parse(nq)),
+                              size=searcher.doc_count_all())
+                pooled.cache[cache_key] = docs
 
-        return results
+            narrowed = docs if narrowed is None else narrowed.intersection(docs)
+
+            if len(narrowed) <= 0:
+                return narrowed
+
+        if narrowed is not None and len(narrowed) >= searcher.doc_count():
+            return None
+
+        return narrowed
 
     def _process_results(self, raw_page, highlight=False, query_string='', spelling_query=None, result_class=None):
-        from haystack import connections
         results = []
 
         # It's important to grab the hits first before slicing. Otherwise, this
@@ -597,49 +976,30 @@ class WhooshSearchBackend(BaseSearchBackend):
 
         facets = {}
         spelling_suggestion = None
-        unified_index = connections[self.connection_alias].get_unified_index()
-        indexed_models = unified_index.get_indexed_models()
+
+        if highlight:
+            highlighter = self._build_highlighter(query_string)
 
         for doc_offset, raw_result in enumerate(raw_page):
             score = raw_page.score(doc_offset) or 0
-            app_label, model_name = raw_result[DJANGO_CT].split('.')
-            additional_fields = {}
-            model = haystack_get_model(app_label, model_name)
+            decoder = self._get_decoder(raw_result[DJANGO_CT])
+
+            if decoder is not None:
+                app_label, model_name, converters = decoder
+                additional_fields = {}
 
-            if model and model in indexed_models:
                 for key, value in raw_result.items():
-                    index = unified_index.get_index(model)
-                    string_key = str(key)
-
-                    if string_key in index.fields and hasattr(index.fields[string_key], 'convert'):
-                        # Special-cased due to the nature of KEYWORD fields.
-                        if index.fields[string_key].is_multivalued:
-                            if value is None or len(value) is 0:
-                                additional_fields[string_key] = []
-                            else:
-                                additional_fields[string_key] = value.split(',')
-                        else:
-                            additional_fields[string_key] = index.fields[string_key].convert(value)
-                    else:
-                        additional_fields[string_key] = self._to_python(value)
+                    convert = converters.get(key, self._to_python)
+
+                    if convert is not None:
+                        additional_fields[key] = convert(value)
 
-                del(additional_fields[DJANGO_CT])
-                del(additional_fields[DJANGO_ID])
+                if getattr(raw_page, 'generation', None) is not None:
+                    additional_fields['search_after'] = raw_page.cursor(doc_offset)
 
                 if highlight:
-                    sa = StemmingAnalyzer()
-                    formatter = WhooshHtmlFormatter('em')
-                    terms = [token.text for token in sa(query_string)]
-
-                    whoosh_result = whoosh_highlight(
-                        additional_fields.get(self.content_field_name),
-                        terms,
-                        sa,
-                        ContextFragmenter(),
-                        formatter
-                    )
                     additional_fields['highlighted'] = {
-                        self.content_field_name: [whoosh_result],
+                        self.content_field_name: [highlighter(raw_result[ID], additional_fields.get(self.content_field_name))],
                     }
 
                 result = result_class(app_label, model_name, raw_result[DJANGO_ID], score, **additional_fields)
@@ -660,15 +1020,95 @@ class WhooshSearchBackend(BaseSearchBackend):
             'spelling_suggestion': spelling_suggestion,
         }
 
+    def _get_decoder(self, django_ct):
+        """
+        Returns ``(app_label, model_name, converters)`` for a stored
+        ``django_ct``, or ``None`` if the model is not indexed.
+
+        ``converters`` maps each stored field name straight to the function
+        that turns its value into Python (``None`` drops the field), so
+        materializing a hit is one dictionary lookup per field. Decoders are
+        built once per model and discarded when the schema is rebuilt.
+        """
+        try:
+            return self._decoders[django_ct]
+        except KeyError:
+            pass
+
+        from haystack import connections
+        unified_index = connections[self.connection_alias].get_unified_index()
+        app_label, model_name = django_ct.split('.')
+        model = haystack_get_model(app_label, model_name)
+        decoder = None
+
+        if model and model in unified_index.get_indexed_models():
+            index = unified_index.get_index(model)
+            converters = {
+                ID: force_text,
+                DJANGO_CT: None,
+                DJANGO_ID: None,
+            }
+
+            for field_name, field in index.fields.items():
+                if not hasattr(field, 'convert'):
+                    continue
+
+                # Special-cased due to the nature of KEYWORD fields.
+                if field.is_multivalued:
+                    converters[field_name] = split_multivalued
+                else:
+                    converters[field_name] = field.convert
+
+            decoder = (app_label, model_name, converters)
+
+        self._decoders[django_ct] = decoder
+        return decoder
+
+    def _build_highlighter(self, query_string):
+        """
+        Prepares highlighting for one query and returns a function that
+        highlights a single hit.
+
+        The query is tokenized once with the same jieba analyzer the content
+        field was indexed with (a stemming analyzer misses most Chinese
+        terms). The fragmenter and formatter are reused across hits, and each
+        highlighted fragment is cached per (document, query, text).
+        """
+        analyzer = get_analyzer()
+        terms = frozenset(token.text for token in analyzer(query_string))
+        fragmenter = ContextFragmenter()
+        formatter = WhooshHtmlFormatter('em')
+
+        def highlighter(doc_id, text):
+            if not text or not terms:
+                return text
+
+            cache_key = (doc_id, query_string, hash(text))
+            fragment = self.highlight_cache.get(cache_key)
+
+            if fragment is None:
+                fragment = whoosh_highlight(text, terms, analyzer, fragmenter, formatter)
+                self.highlight_cache.set(cache_key, fragment)
+
+            return fragment
+
+        return highlighter
+
     def create_spelling_suggestion(self, query_string):
+        """
+        Suggests a correction for each word of ``query_string``.
+
+        The corrector is built once per index generation from the pooled
+        searcher's reader (which the pool closes), and suggestions are
+        memoized per cleaned query on the same generation.
+        """
         spelling_suggestion = None
-        reader = self.index.reader()
-        corrector = reader.corrector(self.content_field_name)
-        cleaned_query = force_text(query_string)
 
         if not query_string:
             return spelling_suggestion
 
+        cleaned_query = force_text(query_string)
+
         # Clean the string.
         for rev_word in self.RESERVED_WORDS:
             cleaned_query = cleaned_query.replace(rev_word, '')
@@ -678,15 +1118,35 @@ class WhooshSearchBackend(BaseSearchBackend):
 
         # Break it down.
         query_words = cleaned_query.split()
-        suggested_words = []
 
-        for word in query_words:
-            suggestions = corrector.suggest(word, limit=1)
+        with self.searcher_pool.searcher() as pooled:
+            suggestions = pooled.cache.get('spelling')
+
+            if suggestions is None:
+                suggestions = pooled.cache['spelling'] = LRUCache(1024)
+
+            cache_key = ' '.join(query_words)
+            spelling_suggestion = suggestions.get(cache_key)
+
+            if spelling_suggestion is not None:
+                return spelling_suggestion
+
+            corrector = pooled.cache.get('corrector')
+
+            if corrector is None:
+                corrector = pooled.cache['corrector'] = pooled.searcher.reader().corrector(self.content_field_name)
+
+            suggested_words = []
+
+            for word in query_words:
+                suggestions_for_word = corrector.suggest(word, limit=1)
+
+                if len(suggestions_for_word) > 0:
+                    suggested_words.append(suggestions_for_word[0])
 
-            if len(suggestions) > 0:
-                suggested_words.append(suggestions[0])
+            spelling_suggestion = ' '.join(suggested_words)
+            suggestions.set(cache_key, spelling_suggestion)
 
-        spelling_suggestion = ' '.join(suggested_words)
         return spelling_suggestion
 
     def _from_python(self, value):
@@ -750,6 +1210,30 @@ class WhooshSearchBackend(BaseSearchBackend):
 
 
 class WhooshSearchQuery(BaseSearchQuery):
+    def __init__(self, using=DEFAULT_ALIAS):
+        super(WhooshSearchQuery, self).__init__(using=using)
+        self.search_after = None
+
+    def set_search_after(self, cursor):
+        """
+        Continues a relevance-ranked search after ``cursor``, the
+        ``search_after`` value of the last result of the previous page.
+        """
+        self.search_after = cursor
+
+    def build_params(self, spelling_query=None):
+        kwargs = super(WhooshSearchQuery, self).build_params(spelling_query=spelling_query)
+
+        if self.search_after:
+            kwargs['search_after'] = self.search_after
+
+        return kwargs
+
+    def _clone(self, klass=None, using=None):
+        clone = super(WhooshSearchQuery, self)._clone(klass=klass, using=using)
+        clone.search_after = self.search_after
+        return clone
+
     def _convert_datetime(self, date):
         if hasattr(date, 'hour'):
             return force_text(date.strftime('%Y%m%d%H%M%S'))
@@ -140,8 +140,9 @@ ENGINE：django haystack使用的搜索引擎
 PATH：索引文件存放位置
 HAYSTACK_SEARCH_RESULTS_PER_PAGE：指定如何对搜索结果分页，为每 10 项结果为一页
 HAYSTACK_SIGNAL_PROCESSOR：指定什么时候更新索引
-    使用 haystack.signals.RealtimeSignalProcessor，作用是每当有文章更新时就更新索引
-    由于博客文章更新不会太频繁，因此实时更新没有问题
+    使用 blog.search_signals.QueuedSignalProcessor，文章更新后由后台线程批量更新索引
+    只修改 views 等不影响索引内容的字段时不更新索引
+SEARCH_INDEX_QUEUE_DELAY：文章更新后等待多少秒再写入索引，期间的改动合并为一批，设为 0 则立即写入
 '''
 HAYSTACK_CONNECTIONS = {
     'default': {
@@ -150,4 +151,84 @@ HAYSTACK_CONNECTIONS = {
     },
 }
 HAYSTACK_SEARCH_RESULTS_PER_PAGE = 10
-HAYSTACK_SIGNAL_PROCESSOR = 'haystack.signals.RealtimeSignalProcessor'
+HAYSTACK_SIGNAL_PROCESSOR = 'blog.search_signals.QueuedSignalProcessor'
+SEARCH_INDEX_QUEUE_DELAY = 2
+
+
+# 缓存设置
+'''
+使用文件缓存，同一台服务器上的多个 worker 进程共享同一份缓存
+MARKDOWN_RENDER_CACHE：Markdown 渲染结果的缓存
+    CACHE_ALIAS：共享缓存使用的 CACHES 别名
+    MAX_ENTRIES：每个进程内 LRU 缓存保存的最大条目数
+    TIMEOUT：共享缓存中渲染结果的过期时间（秒）
+'''
+CACHES = {
+    'default': {
+        'BACKEND': 'django.core.cache.backends.filebased.FileBasedCache',
+        'LOCATION': os.path.join(os.path.dirname(BASE_DIR), 'django_cache_timenote'),
+    },
+}
+MARKDOWN_RENDER_CACHE = {
+    'CACHE_ALIAS': 'default',
+    'MAX_ENTRIES': 128,
+    'TIMEOUT': 60 * 60 * 24 * 7,
+}
+
+
+# 阅读量计数设置
+'''
+阅读量先在内存中缓冲，再批量写入数据库
+VIEW_COUNT_FLUSH_INTERVAL：两次写入之间的最长间隔（秒），设为 0 则每次访问都立即写入
+VIEW_COUNT_FLUSH_THRESHOLD：缓冲的阅读量达到该值时立即写入
+'''
+VIEW_COUNT_FLUSH_INTERVAL = 10
+VIEW_COUNT_FLUSH_THRESHOLD = 100
+
+
+# RSS 设置
+# RSS_FEED_ITEM_COUNT：RSS 中输出的最新文章数
+RSS_FEED_ITEM_COUNT = 20
+
+
+# 文章列表分页设置
+# POST_LIST_PAGINATION：'offset' 按页码用 OFFSET 取出每一页
+#     'keyset' 时上一页/下一页用前一页的文章作为游标做范围查询，翻到很深的页也不会变慢（见 blog/pagination.py）
+POST_LIST_PAGINATION = 'keyset'
+
+
+# 评论设置
+# COMMENTS_PER_PAGE：详情页每次显示的评论数，其余评论点击“加载更多”后按需加载（见 comments/pagination.py）
+COMMENTS_PER_PAGE = 20
+
+
+# 相关文章设置
+# RELATED_POSTS_NUM：每篇文章预先计算并在详情页显示的相关文章数（见 blog/related.py）
+RELATED_POSTS_NUM = 5
+
+
+# jieba 分词设置
+'''
+JIEBA_PRELOAD：启动时（BlogConfig.ready）预先加载 jieba 词典
+    配合 gunicorn --preload 使用时，词典在主进程中加载一次，各 worker 进程共享
+JIEBA_CACHE_FILE：jieba 词典缓存文件的路径，第一次加载后写入，之后启动直接读取
+'''
+JIEBA_PRELOAD = True
+JIEBA_CACHE_FILE = os.path.join(os.path.dirname(BASE_DIR), 'jieba_cache_timenote')
+
+# 日志设置：在控制台输出 blog 应用的 INFO 日志（例如 jieba 词典的加载耗时）
+LOGGING = {
+    'version': 1,
+    'disable_existing_loggers': False,
+    'handlers': {
+        'console': {
+            'class': 'logging.StreamHandler',
+        },
+    },
+    'loggers': {
+        'blog': {
+            'handlers': ['console'],
+            'level': 'INFO',
+        },
+    },
+}
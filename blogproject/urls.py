@@ -17,6 +17,7 @@ from django.conf.urls import url, include
 from django.contrib import admin
 
 from blog.feeds import AllPostsRssFeed
+from blog.views import PostSearchView
 
 urlpatterns = [
     url(r'^admin/', admin.site.urls),
@@ -29,5 +30,5 @@ urlpatterns = [
     url(r'^all/rss/$', AllPostsRssFeed(), name='rss'),
 
     # 搜索的 URL 模式
-    url(r'^search/', include('haystack.urls')),
+    url(r'^search/$', PostSearchView(), name='haystack_search'),
 ]
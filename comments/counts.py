@@ -0,0 +1,41 @@
+from django.db.models import F, Max
+from django.db.models.aggregates import Count
+
+from blog.models import Post
+from .models import Comment
+
+# 文章的评论数和最后评论时间
+
+"""列表页原来用 annotate(Count('comment')) 联结评论表分组统计，详情页和搜索结果页每篇文章还要执行一次 COUNT
+现在评论数和最后评论时间保存在 Post.comment_count 和 Post.last_commented_time 中，和文章一起取出
+新增评论时用 F() 表达式在数据库中原子地加一，并发提交评论也不会丢失计数
+删除评论很少发生，直接按外键索引重新统计这篇文章
+计数有偏差时可以运行 recount_comments 命令全部重新统计"""
+
+
+def comment_added(comment):
+    """新增评论后，在一条 UPDATE 中将文章的评论数加一并记下评论时间
+    评论的 created_time 为保存时的当前时间，新评论总是最新的一条"""
+    Post.objects.filter(pk=comment.post_id).update(comment_count=F('comment_count') + 1,
+                                                   last_commented_time=comment.created_time)
+
+
+def recount_comments(pks):
+    """重新统计 pks 中各文章的评论数和最后评论时间"""
+    for pk in set(pks):
+        stats = Comment.objects.filter(post_id=pk).aggregate(count=Count('id'), last=Max('created_time'))
+        Post.objects.filter(pk=pk).update(comment_count=stats['count'], last_commented_time=stats['last'])
+
+
+def recount_all():
+    """用一次分组查询重新统计全部文章，只更新不一致的文章，返回更新的文章的 pk 列表"""
+    updated = []
+    posts = Post.objects.annotate(
+        num_comments=Count('comment'), last_comment=Max('comment__created_time')
+    ).only('id', 'comment_count', 'last_commented_time')
+    for post in posts:
+        if (post.comment_count, post.last_commented_time) != (post.num_comments, post.last_comment):
+            Post.objects.filter(pk=post.pk).update(comment_count=post.num_comments,
+                                                   last_commented_time=post.last_comment)
+            updated.append(post.pk)
+    return updated
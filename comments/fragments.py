@@ -0,0 +1,15 @@
+from django.core.cache import cache
+from django.core.cache.utils import make_template_fragment_key
+
+# 评论相关的模板片段缓存
+
+"""详情页的评论列表用 {% cache %} 按文章缓存（见 blog/detail.html）
+片段名 COMMENT_LIST_FRAGMENT 必须和模板中的 {% cache ... comment_list post.pk %} 一致
+某篇文章的评论改变时只清除这篇文章的评论列表"""
+
+COMMENT_LIST_FRAGMENT = 'comment_list'
+
+
+def invalidate_comment_list(post_pk):
+    """清除文章 post_pk 的评论列表缓存"""
+    cache.delete(make_template_fragment_key(COMMENT_LIST_FRAGMENT, [post_pk]))
@@ -22,3 +22,11 @@ class Comment(models.Model):
 
     def __str__(self):
         return self.text[:20]
+
+    class Meta:
+        # 评论按发表时间先后排列，pk 保证时间相同时顺序唯一
+        ordering = ['created_time', 'pk']
+        # 详情页按文章取出一页评论，(post, created_time) 联合索引让每页都是一次索引范围扫描（见 pagination.py）
+        indexes = [
+            models.Index(fields=['post', 'created_time'], name='comments_post_created_idx'),
+        ]
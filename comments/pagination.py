@@ -0,0 +1,41 @@
+from collections import namedtuple
+
+from django.conf import settings
+from django.db.models import Q
+
+from .models import Comment
+
+# 评论列表的分页
+
+"""热门文章的评论可能有成千上万条，详情页原来一次取出并渲染全部评论
+现在评论按 (created_time, pk) 升序排列，每次只取出 COMMENTS_PER_PAGE 条：
+    1. 详情页只渲染第一页，后面的评论由“加载更多”按需请求（见 views.comment_list）
+    2. 游标为上一页最后一条评论的 pk，按 (post, created_time) 联合索引从这条评论之后做范围查询
+       不使用 OFFSET，翻到多深都只扫描一页的行"""
+
+COMMENT_ORDERING = ('created_time', 'pk')
+
+# 一页评论：comments 为评论列表，next 为下一页的游标，没有下一页时为 None
+CommentPage = namedtuple('CommentPage', ['comments', 'next'])
+
+
+def get_per_page():
+    return getattr(settings, 'COMMENTS_PER_PAGE', 20)
+
+
+def comment_page(post_pk, after=None, per_page=None):
+    """取出文章 post_pk 在评论 after 之后的一页评论，after 为 None 时取第一页
+    返回 CommentPage(评论列表, 下一页的游标)，没有下一页时游标为 None
+    after 不是这篇文章的评论时抛出 Comment.DoesNotExist"""
+    per_page = per_page or get_per_page()
+    comments = Comment.objects.filter(post_id=post_pk)
+    if after is not None:
+        created_time, pk = Comment.objects.filter(post_id=post_pk, pk=after).values_list('created_time', 'pk').get()
+        comments = comments.filter(Q(created_time__gt=created_time) | Q(created_time=created_time, pk__gt=pk))
+
+    # 多取一条用来判断是否还有下一页
+    comment_list = list(comments.order_by(*COMMENT_ORDERING)[:per_page + 1])
+    if len(comment_list) > per_page:
+        comment_list = comment_list[:per_page]
+        return CommentPage(comment_list, comment_list[-1].pk)
+    return CommentPage(comment_list, None)
@@ -0,0 +1,32 @@
+from django.db import transaction
+from django.db.models.signals import post_save, post_delete
+from django.dispatch import receiver
+
+from .counts import comment_added, recount_comments
+from .fragments import invalidate_comment_list
+from .models import Comment
+
+# 信号处理函数，在 CommentsConfig.ready 中导入以完成注册
+
+
+@receiver(post_save, sender=Comment)
+@receiver(post_delete, sender=Comment)
+def clear_comment_list_cache(sender, instance, **kwargs):
+    """评论新增、修改或删除后，清除所属文章的评论列表缓存
+    等到事务提交后才清除（提交评论在事务中保存，见 views.post_comment），
+    否则提交前到来的请求会把旧的评论列表重新放入缓存"""
+    post_id = instance.post_id
+    transaction.on_commit(lambda: invalidate_comment_list(post_id))
+
+
+@receiver(post_save, sender=Comment)
+def update_comment_count_on_save(sender, instance, created, **kwargs):
+    """新增评论后更新文章的评论数和最后评论时间"""
+    if created:
+        comment_added(instance)
+
+
+@receiver(post_delete, sender=Comment)
+def update_comment_count_on_delete(sender, instance, **kwargs):
+    """删除评论后重新统计所属文章的评论数和最后评论时间"""
+    recount_comments([instance.post_id])
@@ -0,0 +1,14 @@
+from django import template
+
+from ..pagination import comment_page
+
+# 评论的模板标签
+
+register = template.Library()
+
+
+@register.simple_tag
+def get_comment_page(post):
+    """详情页第一页评论的模板标签，返回 CommentPage(评论列表, 下一页的游标)（见 pagination.py）
+    在 {% cache %} 片段中使用，片段有缓存时不会调用，也就不会查询评论"""
+    return comment_page(post.pk)
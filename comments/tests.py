@@ -1,3 +1,85 @@
+import re
+
+from django.contrib.auth.models import User
+from django.core.cache import cache
+from django.db import connection
 from django.test import TestCase
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+from django.utils import timezone
+
+from blog.models import Post, Category
+from .counts import recount_all
+from .models import Comment
 
 # Create your tests here.
+
+
+class CommentTestCase(TestCase):
+    """创建一篇文章，供评论的测试使用"""
+
+    def setUp(self):
+        # 评论列表缓存在事务提交后才清除，测试中不会提交，因此先清空上一个测试留下的缓存
+        cache.clear()
+        now = timezone.now()
+        self.post = Post.objects.create(title='文章', body='正文', created_time=now, modified_time=now,
+                                        category=Category.objects.create(name='分类'),
+                                        author=User.objects.create_user(username='author'))
+
+    def post_comment(self, text):
+        return self.client.post(reverse('comments:post_comment', kwargs={'post_pk': self.post.pk}),
+                                {'name': '评论者', 'email': 'a@example.com', 'text': text})
+
+
+class CommentCountTestCase(CommentTestCase):
+    """提交和删除评论时维护文章的评论数和最后评论时间"""
+
+    def test_counts(self):
+        self.post_comment('第一条')
+        self.post_comment('第二条')
+        self.post.refresh_from_db()
+        last = Comment.objects.latest('created_time')
+        self.assertEqual(self.post.comment_count, 2)
+        self.assertEqual(self.post.last_commented_time, last.created_time)
+
+        last.delete()
+        self.post.refresh_from_db()
+        self.assertEqual(self.post.comment_count, 1)
+        self.assertEqual(self.post.last_commented_time, Comment.objects.get().created_time)
+
+        Post.objects.filter(pk=self.post.pk).update(comment_count=0)
+        self.assertEqual(recount_all(), [self.post.pk])
+        self.post.refresh_from_db()
+        self.assertEqual(self.post.comment_count, 1)
+
+
+class CommentPageTestCase(CommentTestCase):
+    """详情页只显示第一页评论，其余评论由“加载更多”按游标取出"""
+
+    def test_load_more(self):
+        for i in range(5):
+            Comment.objects.create(name='评论者', email='a@example.com', text='评论 %d' % i, post=self.post)
+
+        with self.settings(COMMENTS_PER_PAGE=2):
+            content = self.client.get(self.post.get_absolute_url()).content.decode()
+            self.assertIn('评论 1', content)
+            self.assertNotIn('评论 2', content)
+
+            url = reverse('comments:comment_list', kwargs={'post_pk': self.post.pk})
+            page_sizes = []
+            after = re.search(r'data-after="(\d+)"', content).group(1)
+            while after is not None:
+                data = self.client.get(url, {'after': after}).json()
+                page_sizes.append(data['html'].count('comment-item'))
+                after = data['next']
+        self.assertEqual(page_sizes, [2, 1])
+        self.assertEqual(self.client.get(url, {'after': 'x'}).status_code, 400)
+
+    def test_cached_fragment_skips_comment_query(self):
+        Comment.objects.create(name='评论者', email='a@example.com', text='评论', post=self.post)
+        cache.clear()
+        self.client.get(self.post.get_absolute_url())
+        with CaptureQueriesContext(connection) as context:
+            content = self.client.get(self.post.get_absolute_url()).content.decode()
+        self.assertIn('评论', content)
+        self.assertFalse([query for query in context.captured_queries if 'comments_comment' in query['sql']])
@@ -8,4 +8,5 @@ from . import views
 app_name = 'comments'
 urlpatterns = [
     url(r'^comment/post/(?P<post_pk>[0-9]+)/$', views.post_comment, name='post_comment'),
+    url(r'^comment/list/(?P<post_pk>[0-9]+)/$', views.comment_list, name='comment_list'),
 ]
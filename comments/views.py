@@ -1,62 +1,94 @@
+from django.db import transaction
+from django.http import Http404, JsonResponse, HttpResponseBadRequest
 from django.shortcuts import render, get_object_or_404, redirect
+from django.template.loader import render_to_string
 
 from blog.models import Post
 from .models import Comment
 from .forms import CommentForm
+from .pagination import comment_page
 
 # Create your views here.   ——定义comments应用的视图函数
 
 """
 redirect ——对HTTP请求进行重定向：
-    既可以接收一个 URL 作为参数，也可以接收一个模型的实例作为参数（例如这里的 post）
+    既可以接收一个 URL 作为参数，也可以接收一个模型的实例作为参数（例如 post）
     如果接收一个模型的实例，那么这个模型必须实现了 get_absolute_url 方法
     这样 redirect 会根据 get_absolute_url 方法返回的 URL 值进行重定向。
+    这里传入 URL 模式名和 pk，不需要先从数据库取出文章
 """
 
 
 def post_comment(request, post_pk):
-    """获取被评论的文章，后面需要将评论和文章进行关联"""
-    post = get_object_or_404(Post, pk=post_pk)
+    """提交评论
+    只用 URL 中的 post_pk 关联文章，校验文章是否存在只需一次 exists 查询，不会取出文章正文
+    AJAX 请求返回 JSON：成功时带上新评论的 HTML 片段，失败时带上表单错误
+    普通的表单提交成功后重定向到详情页，失败时才取出文章重新渲染详情页
+    评论保存后由信号清除这篇文章的评论列表缓存，并用 F() 更新文章的评论数（见 signals.py 和 counts.py）"""
 
     '''HTTP请求分 get 和 post
     一般用户通过表单提交数据都是通过 post 请求
-    因此只当用户请求为 post 时才需处理表单数据'''
-    if request.method == 'POST':
-        '''用户提交的数据存在类字典对象 request.POST 中
-        利用这些数据构造 CommentForm 的实例来生成Django表单：'''
-        form = CommentForm(request.POST)
+    因此只当用户请求为 post 时才需处理表单数据
+    不是 post 请求，说明用户没有提交数据，直接重定向到文章详情页'''
+    if request.method != 'POST':
+        return redirect('blog:detail', pk=post_pk)
 
-        if form.is_valid():
-            '''form.is_valid() 方法使Django自动检测表单数据是否符合格式要求（是否填了所有表单字段且数据类型符合）
-            commit=False作用是仅利用表单的数据生成 Comment 模型类的实例，但还不保存评论数据到数据库'''
-            comment = form.save(commit=False)
+    if not Post.objects.filter(pk=post_pk).exists():
+        raise Http404('文章不存在')
 
-            # 将评论和被评论的文章进行关联
-            comment.post = post
+    '''用户提交的数据存在类字典对象 request.POST 中
+    利用这些数据构造 CommentForm 的实例来生成Django表单：'''
+    form = CommentForm(request.POST)
 
-            # 调用模型实例的 save 方法将评论数据保存到数据库
+    if form.is_valid():
+        '''form.is_valid() 方法使Django自动检测表单数据是否符合格式要求（是否填了所有表单字段且数据类型符合）
+        commit=False作用是仅利用表单的数据生成 Comment 模型类的实例，但还不保存评论数据到数据库'''
+        comment = form.save(commit=False)
+
+        # 用文章的 pk 将评论和被评论的文章进行关联
+        comment.post_id = int(post_pk)
+
+        # 调用模型实例的 save 方法将评论数据保存到数据库
+        # 文章的评论数由 post_save 信号更新，和评论在同一个事务中提交
+        with transaction.atomic():
             comment.save()
 
-            '''重定向到 post 的详情页
-            当 redirect 函数接收一个模型的实例时，它会调用这个模型实例的 get_absolute_url 方法
-            然后重定向到 get_absolute_url 方法返回的 URL'''
-            return redirect(post)
-
-        else:
-            '''检查到数据不合法，重新渲染详情页，并且渲染表单的错误
-            因此传递三个模板变量给 detail.html：
-                一个是文章 Post ，一个是评论列表 comment_list，一个是表单 form
-            post.comment_set.all() 方法：
-                这个方法有点类似于 Post.objects.all()
-                其作用是获取这篇 post 下的的全部评论
-                因为 Post 和 Comment 是 ForeignKey 关联的
-                因此使用 post.comment_set.all() 反向查询全部评论
-            '''
-            comment_list = post.comment_set.all()
-            context = {'post': post,
-                       'form': form,
-                       'comment_list': comment_list
-                       }
-            return render(request, 'blog/detail.html', context=context)
-    # 不是 post 请求，说明用户没有提交数据，重定向到文章详情页
-    return redirect(post)
+        if request.is_ajax():
+            return JsonResponse({
+                'ok': True,
+                'html': render_to_string('comments/comment_item.html', {'comment': comment}),
+                'comment_count': Post.objects.filter(pk=post_pk).values_list('comment_count', flat=True).first(),
+            })
+
+        # 重定向到文章的详情页
+        return redirect('blog:detail', pk=post_pk)
+
+    if request.is_ajax():
+        return JsonResponse({'ok': False, 'errors': form.errors}, status=400)
+
+    '''检查到数据不合法，重新渲染详情页，并且渲染表单的错误
+    因此传递两个模板变量给 detail.html：
+        一个是文章 Post ，一个是表单 form
+    正文使用预渲染的 body_html，评论列表由模板中的 get_comment_page 标签取出，在模板中有缓存时不会被查询'''
+    post = get_object_or_404(Post.objects.select_related('category', 'author'), pk=post_pk)
+    context = {'post': post,
+               'form': form,
+               }
+    return render(request, 'blog/detail.html', context=context)
+
+
+def comment_list(request, post_pk):
+    """“加载更多”评论
+    GET 参数 after 为已显示的最后一条评论的 pk，返回它之后的一页评论的 HTML 片段和下一页的游标"""
+    try:
+        after = int(request.GET['after'])
+    except (KeyError, ValueError):
+        return HttpResponseBadRequest('after 参数无效')
+
+    try:
+        comments, next_comment = comment_page(post_pk, after=after)
+    except Comment.DoesNotExist:
+        raise Http404('评论不存在')
+
+    html = ''.join(render_to_string('comments/comment_item.html', {'comment': comment}) for comment in comments)
+    return JsonResponse({'html': html, 'next': next_comment})